@@ -20,6 +20,9 @@ class ImageTransformer(BaseTransformer):
             self.__class__, "allowed_image_mime_types", []
         )
 
+    def handles_mime_type(self, mime_type: str) -> bool:
+        return mime_type in self.allowed_image_mime_types
+
     def transform(self, key: Key, resource: BlobResource) -> Spec | None:
         if resource.mime_type not in self.allowed_image_mime_types:
             return None
@@ -57,6 +60,9 @@ class DocumentTransformer(BaseTransformer):
             self.__class__, "allowed_document_mime_types", []
         )
 
+    def handles_mime_type(self, mime_type: str) -> bool:
+        return mime_type in self.allowed_document_mime_types
+
     def transform(self, key: Key, resource: BlobResource) -> Spec | None:
         if resource.mime_type not in self.allowed_document_mime_types:
             return None
@@ -1,15 +1,78 @@
+import re
+from collections.abc import Iterable
+from functools import lru_cache
 from typing import cast
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup, Tag
 
+# SoupStrainer moved to bs4.filter in beautifulsoup4 4.13, older versions
+# only have it in bs4.element
+try:
+    from bs4.filter import SoupStrainer
+except ImportError:
+    from bs4.element import SoupStrainer  # pyright: ignore[reportPrivateImportUsage]
+
 from isekai.types import BlobResource, Key, MinedResource, TextResource
 
+# Matches the opening of any tag HTMLImageMiner extracts URLs from
+_IMAGE_TAG_RE = re.compile(r"<(?:img|source)\b", re.IGNORECASE)
+
+# Tags HTMLImageMiner reads URLs from
+_IMAGE_TAG_NAMES = frozenset(("img", "source"))
+
+# Matches each comma-separated srcset candidate, capturing its URL and
+# consuming the optional width/density descriptor after it
+_SRCSET_URL_RE = re.compile(r"([^,\s]+)(?:\s+[^,]*)?")
+
+
+@lru_cache(maxsize=65536)
+def _resolve_url_cached(base_url: str | None, url: str) -> str:
+    """
+    Resolve a URL found in a page against the page's base URL.
+
+    Absolute URLs, and any URL when there is no base URL, are returned as is.
+    Cached because the same base URL is shared by every link on a page and the
+    same links (logos, icons, navigation) recur across pages.
+    """
+    if base_url is None or urlparse(url).scheme:
+        return url
+    return urljoin(base_url, url)
+
+
+@lru_cache(maxsize=65536)
+def _normalize_page_url(url: str) -> str:
+    """
+    Normalize a page URL by adding a trailing slash and removing query/fragment.
+
+    Cached for the same reason as _resolve_url_cached, navigation links repeat
+    on every page of a site.
+    """
+    parsed = urlparse(url)
+
+    # Remove query parameters and fragments
+    path = parsed.path
+
+    # Add trailing slash if not present and path doesn't end with a file extension
+    if path and not path.endswith("/") and "." not in path.split("/")[-1]:
+        path += "/"
+    elif not path:
+        path = "/"
+
+    # Reconstruct URL without query/fragment
+    return parsed._replace(path=path, query="", fragment="").geturl()
+
 
 class BaseMiner:
     def mine(
         self, key: Key, resource: TextResource | BlobResource
-    ) -> list[MinedResource]:
+    ) -> Iterable[MinedResource]:
+        """
+        Discover resources referenced by the given resource.
+
+        Miners may return any iterable, including a generator that yields
+        resources as they are found. The pipeline consumes it exactly once.
+        """
         return []
 
 
@@ -25,9 +88,31 @@ class BaseHTMLMiner(BaseMiner):
 
     Subclasses must implement:
     - _extract_urls(): Extract URLs and metadata from parsed HTML
+
+    The BeautifulSoup tree builder is set by the `parser` class attribute.
+    Parsing dominates mining time, so on large crawls it is worth switching
+    to a faster installed builder such as "lxml".
+
+    Set `parse_only` to the tag names `_extract_urls()` looks at to build the
+    tree from just those tags and their contents. None parses everything. A
+    subclass that overrides `_extract_urls()` without setting `parse_only`
+    parses everything, as it may read tags its parent's filter drops.
+
+    Set `unique` to True to only return the first occurrence of each URL on a
+    page, e.g. an image referenced by both an <img> and its srcset.
     """
 
     allowed_domains: list[str] = []
+    parser: str = "html.parser"
+    parse_only: list[str] | None = None
+    unique: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # An inherited parse_only names the tags the parent's _extract_urls
+        # reads, which says nothing about an overriding one
+        if "_extract_urls" in cls.__dict__ and "parse_only" not in cls.__dict__:
+            cls.parse_only = None
 
     def __init__(self, allowed_domains: list[str] | None = None):
         """
@@ -47,30 +132,48 @@ class BaseHTMLMiner(BaseMiner):
         if not isinstance(resource, TextResource):
             return mined_resources
 
+        # Resolved once per page, every URL on it shares the same base
         base_url = self._determine_base_url(key, resource)
-        soup = BeautifulSoup(resource.text, "html.parser")
+        soup = BeautifulSoup(
+            resource.text,
+            self.parser,
+            parse_only=SoupStrainer(self.parse_only) if self.parse_only else None,
+        )
         url_data = self._extract_urls(soup)
+        seen_urls: set[str] = set()
+        # Resolved once per page rather than per URL
+        allowed_netlocs = self._allowed_netlocs()
 
+        # Resolve, filter and build keys in a single pass, parsing each URL
+        # once and rejecting disallowed URLs before anything is allocated
         for url, metadata in url_data:
-            parsed_url = urlparse(url)
-            if parsed_url.scheme:
-                resolved_url = url
-            elif base_url is None:
-                resolved_url = url
-            else:
-                resolved_url = urljoin(base_url, url)
+            resolved_url = self._resolve_url(base_url, url)
+            if not resolved_url:
+                continue
 
-            if self._is_domain_allowed(resolved_url) and resolved_url:
-                parsed_resolved = urlparse(resolved_url)
-                if parsed_resolved.scheme:
-                    mined_key = Key(type="url", value=resolved_url)
-                else:
-                    mined_key = Key(type="path", value=resolved_url)
+            if self.unique:
+                if resolved_url in seen_urls:
+                    continue
+                seen_urls.add(resolved_url)
 
-                mined_resources.append(MinedResource(key=mined_key, metadata=metadata))
+            parsed_url = urlparse(resolved_url)
+            netloc = parsed_url.netloc
+            if netloc and allowed_netlocs is not None and netloc not in allowed_netlocs:
+                continue
+
+            key_type = "url" if parsed_url.scheme else "path"
+            mined_resources.append(
+                MinedResource(
+                    key=Key(type=key_type, value=resolved_url), metadata=metadata
+                )
+            )
 
         return mined_resources
 
+    def _resolve_url(self, base_url: str | None, url: str) -> str:
+        """Resolve an extracted URL against the page's base URL."""
+        return _resolve_url_cached(base_url, url)
+
     def _extract_urls(self, soup: BeautifulSoup) -> list[tuple[str, dict[str, str]]]:
         """
         Extract URLs and their metadata from parsed HTML.
@@ -89,17 +192,19 @@ class BaseHTMLMiner(BaseMiner):
         self, key: Key, resource: TextResource | BlobResource
     ) -> str | None:
         """Determine the best base URL for resolving relative URLs."""
-        if "response_headers" in resource.metadata:
-            response_headers = resource.metadata["response_headers"]
-            if "Host" in response_headers:
-                host = response_headers["Host"]
-                if key.type == "url":
-                    original_url = key.value
-                    parsed_original = urlparse(original_url)
-                    scheme = parsed_original.scheme or "https"
-                    return f"{scheme}://{host}"
-                else:
-                    return f"https://{host}"
+        response_headers = resource.metadata.get("response_headers") or {}
+        host = response_headers.get("Host")
+        if host is None:
+            # Header names are case-insensitive, and HTTP/2 sends them lowercased
+            host = next(
+                (v for k, v in response_headers.items() if k.lower() == "host"), None
+            )
+        if host is not None:
+            if key.type == "url":
+                scheme = urlparse(key.value).scheme or "https"
+                return f"{scheme}://{host}"
+            else:
+                return f"https://{host}"
 
         if key.type == "url":
             return key.value
@@ -113,13 +218,24 @@ class BaseHTMLMiner(BaseMiner):
         if not parsed_url.netloc:
             return True
 
-        if not self.allowed_domains:
-            return False
+        return self._is_netloc_allowed(parsed_url.netloc)
 
-        if "*" in self.allowed_domains:
-            return True
+    def _is_netloc_allowed(self, netloc: str) -> bool:
+        """Check if a (non-empty) network location is allowed by allowed_domains."""
+        allowed_netlocs = self._allowed_netlocs()
+        return allowed_netlocs is None or netloc in allowed_netlocs
 
-        return parsed_url.netloc in self.allowed_domains
+    def _allowed_netlocs(self) -> frozenset[str] | None:
+        """
+        Return the set of allowed network locations, or None if all are allowed.
+
+        Built from allowed_domains when called rather than once in __init__,
+        so it follows reassignments. Callers checking many URLs resolve it
+        once and reuse it.
+        """
+        if "*" in self.allowed_domains:
+            return None
+        return frozenset(self.allowed_domains)
 
 
 class HTMLImageMiner(BaseHTMLMiner):
@@ -133,47 +249,77 @@ class HTMLImageMiner(BaseHTMLMiner):
 
     Metadata extraction:
     - Alt text from <img> tags is captured and stored in metadata["alt_text"]
+
+    Pages without <img> or <source> tags are skipped without parsing, and only
+    those tags are parsed. Subclasses that override _extract_urls get the
+    whole page instead, unless they set parse_only themselves.
     """
 
+    # <picture> is kept so its <source> children can be told apart from
+    # <source> elements in <video> and <audio>
+    parse_only = ["img", "picture", "source"]
+    # Whether _extract_urls only reads the tags above
+    _image_tags_only = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A custom _extract_urls may read other markup, e.g. CSS
+        # background-image or data-src on divs
+        if "_extract_urls" in cls.__dict__:
+            cls._image_tags_only = False
+
+    def mine(
+        self, key: Key, resource: TextResource | BlobResource
+    ) -> list[MinedResource]:
+        # Skip parsing entirely for pages that can't contain any images
+        if (
+            self._image_tags_only
+            and isinstance(resource, TextResource)
+            and not _IMAGE_TAG_RE.search(resource.text)
+        ):
+            return []
+
+        return super().mine(key, resource)
+
     def _extract_urls(self, soup: BeautifulSoup) -> list[tuple[str, dict[str, str]]]:
         """Extract image URLs and alt text from HTML."""
         image_data = []
+        source_data = []
+
+        # Walk the tree once for both tags, keeping <img> URLs ahead of
+        # <picture> sources as before. A plain walk with a set lookup skips
+        # find_all's generic matching machinery.
+        for tag in soup.descendants:
+            # Text nodes and comments aren't tags and carry no URLs
+            if not isinstance(tag, Tag) or tag.name not in _IMAGE_TAG_NAMES:
+                continue
 
-        for img in soup.find_all("img"):
-            img_tag = cast(Tag, img)
-            alt_text = str(img_tag.get("alt", ""))
+            if tag.name == "source":
+                srcset = tag.get("srcset")
+                if srcset and tag.find_parent("picture") is not None:
+                    for url in self._parse_srcset(str(srcset)):
+                        source_data.append((url, {}))
+                continue
+
+            alt_text = str(tag.get("alt", ""))
 
-            src = img_tag.get("src")
+            src = tag.get("src")
             if src:
                 metadata = {"alt_text": alt_text} if alt_text else {}
                 image_data.append((str(src), metadata))
 
-            srcset = img_tag.get("srcset")
+            srcset = tag.get("srcset")
             if srcset:
                 metadata = {"alt_text": alt_text} if alt_text else {}
                 for url in self._parse_srcset(str(srcset)):
                     image_data.append((url, metadata))
 
-        for picture in soup.find_all("picture"):
-            picture_tag = cast(Tag, picture)
-            for source in picture_tag.find_all("source"):
-                source_tag = cast(Tag, source)
-                srcset = source_tag.get("srcset")
-                if srcset:
-                    for url in self._parse_srcset(str(srcset)):
-                        image_data.append((url, {}))
-
+        image_data.extend(source_data)
         return image_data
 
     def _parse_srcset(self, srcset: str) -> list[str]:
         """Parse srcset attribute and extract URLs."""
-        urls = []
-        for entry in srcset.split(","):
-            entry = entry.strip()
-            if entry:
-                url_part = entry.split()[0]
-                urls.append(url_part)
-        return urls
+        return _SRCSET_URL_RE.findall(srcset)
 
 
 class HTMLDocumentMiner(BaseHTMLMiner):
@@ -196,6 +342,8 @@ class HTMLDocumentMiner(BaseHTMLMiner):
     - Link text from <a> tags is captured and stored in metadata["link_text"]
     """
 
+    parse_only = ["a"]
+
     document_extensions: list[str] = [
         "pdf",
         "doc",
@@ -279,6 +427,8 @@ class HTMLPageMiner(BaseHTMLMiner):
     - Link text from <a> tags is captured and stored in metadata["link_text"]
     """
 
+    parse_only = ["a"]
+
     def _extract_urls(self, soup: BeautifulSoup) -> list[tuple[str, dict[str, str]]]:
         """Extract page URLs and link text from HTML."""
         page_data = []
@@ -305,38 +455,12 @@ class HTMLPageMiner(BaseHTMLMiner):
 
         return page_data
 
-    def mine(
-        self, key: Key, resource: TextResource | BlobResource
-    ) -> list[MinedResource]:
-        mined_resources = []
-
-        if not isinstance(resource, TextResource):
-            return mined_resources
-
-        base_url = self._determine_base_url(key, resource)
-        soup = BeautifulSoup(resource.text, "html.parser")
-        url_data = self._extract_urls(soup)
-
-        for url, metadata in url_data:
-            parsed_url = urlparse(url)
-            if parsed_url.scheme:
-                resolved_url = url
-            elif base_url is None:
-                resolved_url = url
-            else:
-                resolved_url = urljoin(base_url, url)
-                resolved_url = self._normalize_url(resolved_url)
-
-            if self._is_domain_allowed(resolved_url) and resolved_url:
-                parsed_resolved = urlparse(resolved_url)
-                if parsed_resolved.scheme:
-                    mined_key = Key(type="url", value=resolved_url)
-                else:
-                    mined_key = Key(type="path", value=resolved_url)
-
-                mined_resources.append(MinedResource(key=mined_key, metadata=metadata))
-
-        return mined_resources
+    def _resolve_url(self, base_url: str | None, url: str) -> str:
+        """Resolve an extracted URL, normalizing it again if it was joined."""
+        resolved_url = _resolve_url_cached(base_url, url)
+        if resolved_url != url:
+            resolved_url = self._normalize_url(resolved_url)
+        return resolved_url
 
     def _is_page_url(self, url: str) -> bool:
         """Check if URL points to a page (no file extension)."""
@@ -351,17 +475,4 @@ class HTMLPageMiner(BaseHTMLMiner):
 
     def _normalize_url(self, url: str) -> str:
         """Normalize URL by adding trailing slash and removing query/fragment."""
-        parsed = urlparse(url)
-
-        # Remove query parameters and fragments
-        path = parsed.path
-
-        # Add trailing slash if not present and path doesn't end with a file extension
-        if path and not path.endswith("/") and "." not in path.split("/")[-1]:
-            path += "/"
-        elif not path:
-            path = "/"
-
-        # Reconstruct URL without query/fragment
-        normalized = parsed._replace(path=path, query="", fragment="").geturl()
-        return normalized
+        return _normalize_page_url(url)
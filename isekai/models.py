@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import TYPE_CHECKING, Any, Literal
 
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -90,13 +91,16 @@ class AbstractResource(models.Model):
             return self.blob_data
         return None
 
-    def transition_to(self, next_status: Status):
+    def transition_to(self, next_status: Status, now: datetime | None = None):
         """Transition the resource to a new status.
 
         1. Ensures that only valid transitions are allowed.
         2. Ensures that the resource is valid for the next status.
         3. Updates the status and relevant timestamps.
+
+        Pass `now` to stamp a batch of resources with the same timestamp.
         """
+        now = now or timezone.now()
 
         # SEEDED -> EXTRACTED
         if self.status == self.Status.SEEDED and next_status == self.Status.EXTRACTED:
@@ -105,12 +109,12 @@ class AbstractResource(models.Model):
 
             self.last_error = ""
             self.status = next_status
-            self.extracted_at = timezone.now()
+            self.extracted_at = now
         # EXTRACTED -> MINED
         elif self.status == self.Status.EXTRACTED and next_status == self.Status.MINED:
             self.last_error = ""
             self.status = next_status
-            self.mined_at = timezone.now()
+            self.mined_at = now
         # MINED -> TRANSFORMED
         elif (
             self.status == self.Status.MINED and next_status == self.Status.TRANSFORMED
@@ -122,7 +126,7 @@ class AbstractResource(models.Model):
 
             self.last_error = ""
             self.status = next_status
-            self.transformed_at = timezone.now()
+            self.transformed_at = now
         # TRANSFORMED -> LOADED
         elif (
             self.status == self.Status.TRANSFORMED and next_status == self.Status.LOADED
@@ -134,7 +138,7 @@ class AbstractResource(models.Model):
 
             self.last_error = ""
             self.status = next_status
-            self.loaded_at = timezone.now()
+            self.loaded_at = now
         else:
             raise TransitionError(
                 f"Cannot transition from {self.status} to {next_status}"
@@ -1,3 +1,4 @@
+import json
 import logging
 import random
 import time
@@ -9,6 +10,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.files.base import ContentFile
 from django.db import transaction
 from django.db.models import Model, Prefetch
+from django.utils import timezone
 
 from isekai.types import (
     BlobRef,
@@ -16,7 +18,6 @@ from isekai.types import (
     FieldFileProxy,
     FileProxy,
     Key,
-    MinedResource,
     ModelRef,
     OperationResult,
     PathFileProxy,
@@ -109,14 +110,18 @@ class Pipeline:
         failed_seeders = []
 
         seeded_resources: list[SeededResource] = []
-        for seeder in self.seeders:
-            try:
-                resources = seeder.seed()
-            except Exception:
-                failed_seeders.append(seeder)
-                continue
 
-            seeded_resources.extend(seeder.seed())
+        # Seeders usually wait on the network or disk, so run them in parallel
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(seeder.seed) for seeder in self.seeders]
+
+            # Collect results in seeder order so earlier seeders still win
+            # when several seed the same key
+            for seeder, future in zip(self.seeders, futures, strict=True):
+                try:
+                    seeded_resources.extend(future.result())
+                except Exception:
+                    failed_seeders.append(seeder)
 
         logger.info(f"Found {len(seeded_resources)} resources from seeders")
 
@@ -262,6 +267,29 @@ class Pipeline:
             metadata={},
         )
 
+    def _run_miners(
+        self,
+        key: Key,
+        resource_obj: TextResource | BlobResource,
+        miners: list[Any],
+    ) -> list[Any]:
+        """Run all miners on a resource and return unsaved Resources for everything
+        they discovered.
+
+        This method is designed to run in a thread pool for parallel mining.
+        """
+        # Build the Resource rows straight from each miner's output, so
+        # generator-based miners never need their results held in a list
+        Resource = get_resource_model()
+        return [
+            Resource(
+                key=str(mr.key),
+                metadata=dict(mr.metadata) if mr.metadata else None,
+            )
+            for miner in miners
+            for mr in miner.mine(key, resource_obj)
+        ]
+
     def mine(self) -> OperationResult:
         """Mines extracted resources to discover new resources."""
         logger.setLevel(logging.INFO)
@@ -269,67 +297,105 @@ class Pipeline:
 
         logger.info(f"Using {len(self.miners)} miners")
 
-        resources = Resource.objects.filter(status=Resource.Status.EXTRACTED)
-
-        logger.info(f"Found {resources.count()} extracted resources to process")
-
-        seeded_resource_count_before = Resource.objects.filter(
-            status=Resource.Status.SEEDED
-        ).count()
-
-        for resource in resources:
-            logger.info(f"Mining resource: {resource.key}")
-
-            # Create appropriate resource object for mining
-            key = Key.from_string(resource.key)
-            resource_obj = resource.to_resource_dataclass()
+        # Only load the columns mining needs, the other timestamps and the
+        # transform/load state can be sizeable and are never read here
+        resources = list(
+            Resource.objects.filter(status=Resource.Status.EXTRACTED).only(
+                "key",
+                "status",
+                "data_type",
+                "mime_type",
+                "text_data",
+                "blob_data",
+                "metadata",
+                "last_error",
+            )
+        )
 
-            try:
-                # Mine the resource
-                mined_resources: list[MinedResource] = []
+        logger.info(f"Found {len(resources)} extracted resources to process")
 
-                for miner in self.miners:
-                    mined_resources.extend(miner.mine(key, resource_obj))
+        # Submit mining tasks to thread pool
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = []
+            for resource in resources:
+                logger.info(f"Mining resource: {resource.key}")
 
-                logger.info(
-                    f"Discovered {len(mined_resources)} new resources from {resource.key}"
+                # Create appropriate resource object for mining
+                key = Key.from_string(resource.key)
+                resource_obj = resource.to_resource_dataclass()
+                future = executor.submit(
+                    self._run_miners, key, resource_obj, self.miners
                 )
+                futures.append((resource, resource_obj, future))
+
+            # Process results in submission order, so when several resources
+            # discover the same key, the first one still decides its metadata
+            now = timezone.now()
+            new_resources = []
+            mined_resources_to_update = []
+            for resource, resource_obj, future in futures:
+                try:
+                    discovered_resources = future.result()
 
-                # Create Resource objects for new keys
-                new_resources = [
-                    Resource(
-                        key=str(mr.key),
-                        metadata=dict(mr.metadata) if mr.metadata else None,
+                    logger.info(
+                        f"Discovered {len(discovered_resources)} new resources from {resource.key}"
                     )
-                    for mr in mined_resources
-                ]
-
-                # Create resources that don't already exist
-                Resource.objects.bulk_create(new_resources, ignore_conflicts=True)
 
-                # Update the original resource that was mined
-                resource.transition_to(Resource.Status.MINED)
-                resource.save()
+                    new_resources.extend(discovered_resources)
 
-                # Clean up temporary file if it was a blob resource
-                if isinstance(resource_obj, BlobResource) and isinstance(
-                    resource_obj.file_ref, PathFileProxy
-                ):
-                    resource_obj.file_ref.path.unlink(missing_ok=True)
+                    # Update the original resource that was mined
+                    resource.transition_to(Resource.Status.MINED, now=now)
+                    mined_resources_to_update.append(resource)
 
-                logger.info(f"Successfully mined: {resource.key}")
+                    # Clean up temporary file if it was a blob resource
+                    if isinstance(resource_obj, BlobResource) and isinstance(
+                        resource_obj.file_ref, PathFileProxy
+                    ):
+                        resource_obj.file_ref.path.unlink(missing_ok=True)
 
-            except Exception as e:
-                resource.last_error = f"{e.__class__.__name__}: {str(e)}"
-                resource.save()
+                    logger.info(f"Successfully mined: {resource.key}")
 
-                logger.error(f"Failed to mine {resource.key}: {e}")
+                except Exception as e:
+                    resource.last_error = f"{e.__class__.__name__}: {str(e)}"
+                    resource.save()
 
-        seeded_resource_count_after = Resource.objects.filter(
-            status=Resource.Status.SEEDED
-        ).count()
+                    logger.error(f"Failed to mine {resource.key}: {e}")
+
+        logger.info("Saving mined resources to database...")
+
+        # Drop keys discovered more than once, keeping the first occurrence
+        candidates = {}
+        for new_resource in new_resources:
+            candidates.setdefault(new_resource.key, new_resource)
+
+        # Save discovered resources and mark their sources as mined together,
+        # so a failure part way through doesn't leave sources to be re-mined
+        # with only some of their discoveries saved
+        with transaction.atomic():
+            # Look up which keys already exist in one query per batch and only
+            # create the rest. A case-insensitive collation (e.g. MySQL's
+            # default) can return a stored key that isn't byte-for-byte equal
+            # to the candidate, so missing entries are skipped
+            candidate_keys = list(candidates)
+            for i in range(0, len(candidate_keys), 500):
+                for existing_key in Resource.objects.filter(
+                    key__in=candidate_keys[i : i + 500]
+                ).values_list("key", flat=True):
+                    candidates.pop(existing_key, None)
+
+            # ignore_conflicts still guards against rows inserted concurrently
+            Resource.objects.bulk_create(
+                candidates.values(), ignore_conflicts=True, batch_size=500
+            )
+            # Every mined resource gets the same status and timestamp, so a single
+            # UPDATE per batch is enough
+            mined_pks = [r.pk for r in mined_resources_to_update]
+            for i in range(0, len(mined_pks), 500):
+                Resource.objects.filter(pk__in=mined_pks[i : i + 500]).update(
+                    status=Resource.Status.MINED, mined_at=now, last_error=""
+                )
 
-        newly_seeded_count = seeded_resource_count_after - seeded_resource_count_before
+        newly_seeded_count = len(candidates)
         mined_count = sum(1 for r in resources if r.status == Resource.Status.MINED)
         error_count = sum(1 for r in resources if r.last_error)
 
@@ -353,6 +419,34 @@ class Pipeline:
             },
         )
 
+    def _replace_dependencies(
+        self, Resource: Any, resource_dependencies: dict[str, list[str]]
+    ) -> None:
+        """Replace the dependencies of many resources with a few bulk queries.
+
+        Equivalent to calling `resource.dependencies.set(keys)` for each entry,
+        without the per-resource SELECT, DELETE and INSERT round trips.
+        """
+        through = Resource.dependencies.through
+        field = Resource.dependencies.field
+        from_field = through._meta.get_field(field.m2m_field_name())
+        to_field = through._meta.get_field(field.m2m_reverse_field_name())
+
+        resource_keys = list(resource_dependencies)
+        for i in range(0, len(resource_keys), 500):
+            through.objects.filter(
+                **{f"{from_field.name}__in": resource_keys[i : i + 500]}
+            ).delete()
+
+        through.objects.bulk_create(
+            [
+                through(**{from_field.attname: key, to_field.attname: dependency_key})
+                for key, dependency_keys in resource_dependencies.items()
+                for dependency_key in dependency_keys
+            ],
+            batch_size=500,
+        )
+
     def transform(self) -> OperationResult:
         """Transforms mined resources into target specifications."""
         logger.setLevel(logging.INFO)
@@ -360,81 +454,167 @@ class Pipeline:
 
         logger.info(f"Using {len(self.transformers)} transformers")
 
-        content_types = ContentType.objects.values_list("app_label", "model", "pk")
-
-        ct_map = {f"{app_label}.{model}": pk for app_label, model, pk in content_types}
-
-        resources = Resource.objects.filter(status=Resource.Status.MINED)
+        # Skip columns transforming never reads, e.g. the other stages'
+        # timestamps and the loaded object id
+        resources = Resource.objects.filter(status=Resource.Status.MINED).only(
+            "key",
+            "status",
+            "data_type",
+            "mime_type",
+            "text_data",
+            "blob_data",
+            "metadata",
+            "target_content_type",
+            "target_spec",
+            "last_error",
+        )
 
         logger.info(f"Found {resources.count()} mined resources to process")
 
-        for resource in resources:
-            logger.info(f"Transforming resource: {resource.key}")
+        # Transformers that handle each MIME type, in configured order. Built
+        # on first sight of a MIME type so each resource only tries these
+        transformers_by_mime_type: dict[str, list[Any]] = {}
+        # Content type ids by the "app_label.model" strings specs name them by
+        content_type_ids: dict[str, int] = {}
+        # Specs are saved in bulk after the loop, so each one is encoded here
+        # the way its JSONField will be, to fail just that resource if it can't
+        spec_encoder = Resource._meta.get_field("target_spec").encoder
+
+        transformed_resources = []
+        failed_keys_by_error: dict[str, list[str]] = {}
+        resource_dependencies: dict[str, list[str]] = {}
+        processed_count = 0
+        # Stamp every resource transformed in this run with the same time
+        now = timezone.now()
+
+        # Run the whole stage in one transaction that locks the rows it
+        # transforms, so several workers can run transform() at once and each
+        # picks up only resources no other worker holds
+        with transaction.atomic():
+            # Stream rows rather than caching the whole queryset, so resources that
+            # fail or aren't handled aren't held in memory until the end of the run
+            locked_resources = resources.select_for_update(skip_locked=True)
+            for resource in locked_resources.iterator(chunk_size=2000):
+                processed_count += 1
+                logger.info(f"Transforming resource: {resource.key}")
 
-            try:
-                key = Key.from_string(resource.key)
-                resource_obj = resource.to_resource_dataclass()
+                try:
+                    # Each resource gets its own savepoint, so a database error
+                    # from one (e.g. in a transformer) rolls back just that
+                    # resource instead of aborting the run's transaction
+                    with transaction.atomic():
+                        key = Key.from_string(resource.key)
+                        resource_obj = resource.to_resource_dataclass()
+
+                        transformers = transformers_by_mime_type.get(resource.mime_type)
+                        if transformers is None:
+                            transformers = transformers_by_mime_type[
+                                resource.mime_type
+                            ] = [
+                                transformer
+                                for transformer in self.transformers
+                                if transformer.handles_mime_type(resource.mime_type)
+                            ]
+
+                        # Use the first transformer that can handle the resource
+                        spec = None
+                        for transformer in transformers:
+                            if spec := transformer.transform(key, resource_obj):
+                                break
+
+                        if spec:
+                            content_type_id = content_type_ids.get(spec.content_type)
+                            if content_type_id is None:
+                                app_label, _, model = (
+                                    spec.content_type.lower().partition(".")
+                                )
+                                try:
+                                    content_type = (
+                                        ContentType.objects.get_by_natural_key(
+                                            app_label, model
+                                        )
+                                    )
+                                except ContentType.DoesNotExist as e:
+                                    raise TransformError(
+                                        f"Unknown content type: {spec.content_type}"
+                                    ) from e
+                                content_type_id = content_type_ids[
+                                    spec.content_type
+                                ] = content_type.pk
+
+                            spec_dict = spec.to_dict()
+                            json.dumps(spec_dict["attributes"], cls=spec_encoder)
+                            resource.target_content_type_id = content_type_id
+                            resource.target_spec = spec_dict["attributes"]
+
+                            # Set dependencies based on refs found in the spec
+                            refs = spec.find_refs()
+                            dependency_key_strings = [str(ref.key) for ref in refs]
+
+                            # Check if all referenced resources exist
+                            if dependency_key_strings:
+                                existing_keys = set(
+                                    Resource.objects.filter(
+                                        key__in=dependency_key_strings
+                                    ).values_list("key", flat=True)
+                                )
+                                missing_keys = (
+                                    set(dependency_key_strings) - existing_keys
+                                )
+                                if missing_keys:
+                                    raise TransformError("Invalid refs found in spec")
 
-                # Use the first transformer that can handle the resource
-                spec = None
-                for transformer in self.transformers:
-                    if spec := transformer.transform(key, resource_obj):
-                        break
-
-                if spec:
-                    try:
-                        content_type = ct_map[spec.content_type.lower()]
-                    except KeyError as e:
-                        raise TransformError(
-                            f"Unknown content type: {spec.content_type}"
-                        ) from e
-
-                    spec_dict = spec.to_dict()
-                    resource.target_content_type_id = content_type
-                    resource.target_spec = spec_dict["attributes"]
-
-                    # Set dependencies based on refs found in the spec
-                    refs = spec.find_refs()
-                    dependency_key_strings = [str(ref.key) for ref in refs]
-
-                    # Check if all referenced resources exist
-                    if dependency_key_strings:
-                        existing_keys = set(
-                            Resource.objects.filter(
-                                key__in=dependency_key_strings
-                            ).values_list("key", flat=True)
-                        )
-                        missing_keys = set(dependency_key_strings) - existing_keys
-                        if missing_keys:
-                            raise TransformError("Invalid refs found in spec")
+                            resource.transition_to(Resource.Status.TRANSFORMED, now=now)
+                            transformed_resources.append(resource)
+                            resource_dependencies[resource.key] = list(
+                                dict.fromkeys(dependency_key_strings)
+                            )
 
-                    resource.transition_to(Resource.Status.TRANSFORMED)
+                            logger.info(f"Successfully transformed: {resource.key}")
+                        else:
+                            raise TransformError(
+                                "No transformer could handle the resource"
+                            )
 
-                    with transaction.atomic():
-                        resource.save()
-                        resource.dependencies.set(dependency_key_strings)  # type: ignore[call-arg]
+                except Exception as e:
+                    resource.last_error = f"{e.__class__.__name__}: {str(e)}"
+                    failed_keys_by_error.setdefault(resource.last_error, []).append(
+                        resource.key
+                    )
 
-                    logger.info(f"Successfully transformed: {resource.key}")
-                else:
-                    raise TransformError("No transformer could handle the resource")
+                    logger.error(f"Failed to transform {resource.key}: {e}")
 
-            except Exception as e:
-                resource.last_error = f"{e.__class__.__name__}: {str(e)}"
-                resource.save()
+            logger.info("Saving transformed resources to database...")
 
-                logger.error(f"Failed to transform {resource.key}: {e}")
+            Resource.objects.bulk_update(
+                transformed_resources,
+                [
+                    "target_content_type",
+                    "target_spec",
+                    "status",
+                    "transformed_at",
+                    "last_error",
+                ],
+                batch_size=500,
+            )
+            # Failures tend to share a handful of messages (e.g. no transformer
+            # for a MIME type), so write each message with plain UPDATEs
+            for error, keys in failed_keys_by_error.items():
+                for i in range(0, len(keys), 500):
+                    Resource.objects.filter(pk__in=keys[i : i + 500]).update(
+                        last_error=error
+                    )
+            self._replace_dependencies(Resource, resource_dependencies)
 
-        transformed_count = sum(
-            1 for r in resources if r.status == Resource.Status.TRANSFORMED
-        )
-        error_count = sum(1 for r in resources if r.last_error)
+        transformed_count = len(transformed_resources)
+        error_count = sum(len(keys) for keys in failed_keys_by_error.values())
 
         logger.info(
             f"Transform completed: {transformed_count} successful, {error_count} errors"
         )
 
         messages = [
-            f"Processed {len(resources)} resources",
+            f"Processed {processed_count} resources",
             f"Transformed {transformed_count} resources",
         ]
 
@@ -454,12 +634,19 @@ class Pipeline:
 
         logger.info(f"Using {len(self.loaders)} loaders")
 
-        resources = Resource.objects.filter(
-            status=Resource.Status.TRANSFORMED,
-        ).prefetch_related(
-            Prefetch(
-                "dependencies",
-                queryset=Resource.objects.only("key", "status"),
+        # Loading works from the transformed spec, so the extracted text is
+        # never needed, while every resource needs its target content type
+        resources = (
+            Resource.objects.filter(
+                status=Resource.Status.TRANSFORMED,
+            )
+            .select_related("target_content_type")
+            .defer("text_data")
+            .prefetch_related(
+                Prefetch(
+                    "dependencies",
+                    queryset=Resource.objects.only("key", "status"),
+                )
             )
         )
 
@@ -636,20 +823,14 @@ class Pipeline:
                         ],
                     )
             except Exception as e:
-                # Mark resources in this node as failed
-                failed_resources = []
+                # Mark resources in this node as failed. The node's transaction
+                # was rolled back, so only last_error is written, in a single
+                # UPDATE, rather than refreshing each resource to save it again
                 for resource_key in node:
-                    resource = key_to_resource[resource_key]
-                    resource.refresh_from_db()
-                    resource.last_error = f"{e.__class__.__name__}: {str(e)}"
-                    failed_resources.append(resource)
-
-                    logger.error(f"Failed to load {resource.key}: {e}")
+                    logger.error(f"Failed to load {resource_key}: {e}")
 
-                # Save the failed resources
-                Resource.objects.bulk_update(
-                    failed_resources,
-                    ["last_error"],
+                Resource.objects.filter(key__in=list(node)).update(
+                    last_error=f"{e.__class__.__name__}: {str(e)}"
                 )
 
                 # Stop processing - dependent nodes will also fail
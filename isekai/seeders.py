@@ -5,6 +5,11 @@ import requests
 
 from isekai.types import Key, SeededResource
 
+# Handle XML namespace for sitemap
+_SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+_SITEMAP_URL_TAG = f"{{{_SITEMAP_NS}}}url"
+_SITEMAP_LOC_TAG = f"{{{_SITEMAP_NS}}}loc"
+
 
 class BaseSeeder:
     def seed(self) -> list[SeededResource]:
@@ -34,12 +39,20 @@ class CSVSeeder(BaseSeeder):
         resources = []
 
         if self.csv_filename:
-            with open(self.csv_filename) as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if "type" in row and "value" in row:
-                        key = Key(type=row["type"], value=row["value"])
-                        resources.append(SeededResource(key=key, metadata={}))
+            with open(self.csv_filename, newline="") as file:
+                reader = csv.reader(file)
+                header = next(reader, [])
+
+                # Look the columns up once rather than building a dict per row
+                if "type" in header and "value" in header:
+                    type_index = header.index("type")
+                    value_index = header.index("value")
+                    min_length = max(type_index, value_index) + 1
+
+                    for row in reader:
+                        if len(row) >= min_length:
+                            key = Key(type=row[type_index], value=row[value_index])
+                            resources.append(SeededResource(key=key, metadata={}))
 
         return resources
 
@@ -65,17 +78,24 @@ class SitemapSeeder(BaseSeeder):
         resources = []
 
         if self.sitemap_url:
-            response = requests.get(self.sitemap_url)
-            response.raise_for_status()
-
-            root = ET.fromstring(response.content)
-            # Handle XML namespace for sitemap
-            namespaces = {"sitemap": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-
-            for url_elem in root.findall("sitemap:url", namespaces):
-                loc_elem = url_elem.find("sitemap:loc", namespaces)
-                if loc_elem is not None and loc_elem.text:
-                    key = Key(type="url", value=loc_elem.text)
-                    resources.append(SeededResource(key=key, metadata={}))
+            with requests.get(self.sitemap_url, stream=True) as response:
+                response.raise_for_status()
+                # Let urllib3 undo any gzip/deflate Content-Encoding
+                response.raw.decode_content = True
+
+                # Stream the document so only one <url> entry is held in
+                # memory at a time, however large the sitemap is
+                root = None
+                for event, elem in ET.iterparse(response.raw, events=("start", "end")):
+                    if root is None:
+                        root = elem
+                    elif event == "end" and elem.tag == _SITEMAP_URL_TAG:
+                        loc_elem = elem.find(_SITEMAP_LOC_TAG)
+                        if loc_elem is not None and loc_elem.text:
+                            key = Key(type="url", value=loc_elem.text)
+                            resources.append(SeededResource(key=key, metadata={}))
+
+                        # Drop the processed entries from the tree
+                        root.clear()
 
         return resources
@@ -2,5 +2,18 @@ from isekai.types import BlobResource, Key, Spec, TextResource
 
 
 class BaseTransformer:
+    # MIME types this transformer handles, e.g. ["image/png", "text/*"]. The
+    # pipeline only calls transform() for matching resources. None means every
+    # resource is offered to transform().
+    mime_types: list[str] | None = None
+
+    def handles_mime_type(self, mime_type: str) -> bool:
+        """Returns whether resources of the given MIME type should be transformed."""
+        if self.mime_types is None:
+            return True
+
+        major_type = mime_type.partition("/")[0]
+        return mime_type in self.mime_types or f"{major_type}/*" in self.mime_types
+
     def transform(self, key: Key, resource: TextResource | BlobResource) -> Spec | None:
         return None
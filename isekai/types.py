@@ -1,46 +1,105 @@
 import io
 import os
 import re
+import sys
 from collections.abc import Mapping
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import IO, TYPE_CHECKING, Any, ClassVar, Literal, Protocol, overload
-from urllib.parse import parse_qs, unquote, urlencode
+from urllib.parse import parse_qsl, urlencode
 
 if TYPE_CHECKING:
     from django.db.models import FieldFile
 
 
-@dataclass(frozen=True, slots=True)
+# Key types are drawn from a small vocabulary, so they are interned to let
+# equality checks short-circuit on identity
+_KEY_TYPES = {t: sys.intern(t) for t in ("url", "path", "file", "gen")}
+
+
+@dataclass(frozen=True, eq=False)
 class Key:
     """
     Represents a resource key.
     """
 
+    # Slotted by hand rather than with slots=True so the caches below stay
+    # out of the dataclass fields, and out of asdict() and astuple()
+    __slots__ = ("type", "value", "_str", "_hash")
+
     type: str
     value: str
 
+    def __post_init__(self):
+        type_ = self.type
+        # sys.intern only takes exact strs, so subclasses such as StrEnum
+        # members are converted to their plain string value first
+        if type_.__class__ is not str:
+            type_ = str.__str__(type_)
+        object.__setattr__(self, "type", _KEY_TYPES.get(type_) or sys.intern(type_))
+        # Keys are mostly built to be looked up, so the hash is computed once
+        # here rather than on every lookup
+        object.__setattr__(self, "_hash", hash((self.type, self.value)))
+
+    # _str is left unset until __str__ first runs, so construction doesn't pay
+    # for it. Pickling and copying go through the fields alone, as the unset
+    # slot can't be read
+    def __getstate__(self):
+        return (self.type, self.value)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "type", state[0])
+        object.__setattr__(self, "value", state[1])
+        self.__post_init__()
+
+    def __eq__(self, other):
+        # Parsed keys are shared instances, so most equal keys are identical
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.type == other.type and self.value == other.value
+
+    def __hash__(self):
+        return self._hash
+
     @classmethod
     def from_string(cls, key: str) -> "Key":
         """
         Parses a string into a Key object.
         """
-        try:
-            key, value = key.split(":", 1)
-
-            if value == "":
-                raise ValueError("Key must have a value.")
-
-        except ValueError as err:
-            raise ValueError(f"Invalid key format: {key}.") from err
-
-        return cls(type=key, value=value)
+        return _parse_key(cls, key)
 
     def __str__(self) -> str:
         """
         Returns the string representation of the Key.
         """
-        return f"{self.type}:{self.value}"
+        # Formatted on first use and cached
+        try:
+            return self._str
+        except AttributeError:
+            pass
+        value = f"{self.type}:{self.value}"
+        object.__setattr__(self, "_str", value)
+        return value
+
+
+# Keys are immutable, so the same key string parsed again (e.g. a ref that
+# appears in many specs) returns the instance parsed the first time
+@lru_cache(maxsize=65536)
+def _parse_key(cls: type[Key], key: str) -> Key:
+    type_, sep, value = key.partition(":")
+    if not sep or not value:
+        raise ValueError(f"Invalid key format: {key}.")
+
+    # The value isn't interned: values are unbounded URLs and paths, and
+    # interned strings are never freed on newer Pythons. The cache already
+    # shares one instance per key string
+    parsed = cls(type=type_, value=value)
+    # A valid key string is already the formatted form, so cache it as is
+    object.__setattr__(parsed, "_str", key)
+    return parsed
 
 
 @dataclass(frozen=True, slots=True)
@@ -62,7 +121,7 @@ class FileProxy(Protocol):
     def open(self) -> IO[bytes]: ...
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PathFileProxy:
     path: Path
 
@@ -74,7 +133,7 @@ class PathFileProxy:
         return self.path.open("rb")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FieldFileProxy:
     ff: "FieldFile"
 
@@ -86,7 +145,7 @@ class FieldFileProxy:
         return self.ff.storage.open(self.ff.name, mode="rb")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class InMemoryFileProxy:
     content: bytes
 
@@ -112,6 +171,74 @@ class MinedResource:
     metadata: Mapping[str, Any]
 
 
+# What each value type is copied as by _map_leaves: dict, list, or None for
+# leaves. Filled in on first sight of a type, so subclasses resolve the same
+# way isinstance() would while later values cost a single dict lookup
+_COPY_TYPES: dict[type, type | None] = {dict: dict, list: list, tuple: list}
+
+
+def _copy_type(value_type: type) -> type | None:
+    if issubclass(value_type, dict):
+        copy_type = dict
+    elif issubclass(value_type, list | tuple):
+        copy_type = list
+    else:
+        copy_type = None
+    _COPY_TYPES[value_type] = copy_type
+    return copy_type
+
+
+# Leaf types Spec.to_dict() passes through unchanged
+_PLAIN_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+def _map_leaves(
+    data: dict[str, Any],
+    convert,
+    unchanged_types: frozenset[type] = frozenset(),
+    intern_keys: bool = False,
+) -> dict[str, Any]:
+    """
+    Copy nested dicts, lists and tuples, passing every other value through convert.
+
+    Tuples are copied as lists. Walks with an explicit stack rather than
+    recursing, so arbitrarily deep data doesn't hit the recursion limit.
+    unchanged_types are types convert returns as is; lists and tuples made
+    only of them are copied in one go. With intern_keys, short string dict
+    keys are interned so copies of the same attribute names share one string.
+    """
+    result: dict[str, Any] = {}
+    stack: list[tuple[Any, Any]] = [(result, data)]
+    while stack:
+        target, source = stack.pop()
+        items = source.items() if type(target) is dict else enumerate(source)
+        for key, value in items:
+            value_type = type(value)
+            try:
+                copy_type = _COPY_TYPES[value_type]
+            except KeyError:
+                copy_type = _copy_type(value_type)
+
+            if copy_type is None:
+                copy = convert(value)
+            elif (
+                copy_type is list
+                and unchanged_types
+                and all(type(item) in unchanged_types for item in value)
+            ):
+                copy = list(value)
+            else:
+                # Lists are allocated at their final length and filled by
+                # index, so they never grow
+                copy = {} if copy_type is dict else [None] * len(value)
+                stack.append((copy, value))
+
+            if intern_keys and type(key) is str and len(key) <= 64:
+                key = sys.intern(key)
+            target[key] = copy
+    return result
+
+
 @dataclass(frozen=True, slots=True)
 class Spec:
     content_type: str
@@ -119,49 +246,49 @@ class Spec:
 
     def to_dict(self):
         def serialize_value(value):
-            if isinstance(value, BlobRef | ResourceRef | ModelRef):
-                return str(value)
-            elif isinstance(value, dict):
-                return {k: serialize_value(v) for k, v in value.items()}
-            elif isinstance(value, list | tuple):
-                return [serialize_value(v) for v in value]
-            return value
+            # Refs are serialized to strings, everything else is kept as is
+            value_type = type(value)
+            try:
+                is_ref = _IS_REF_TYPE[value_type]
+            except KeyError:
+                is_ref = _IS_REF_TYPE[value_type] = issubclass(value_type, _REF_TYPES)
+            return str(value) if is_ref else value
 
         return {
             "content_type": self.content_type,
-            "attributes": {
-                key: serialize_value(value) for key, value in self.attributes.items()
-            },
+            "attributes": _map_leaves(self.attributes, serialize_value, _PLAIN_TYPES),
         }
 
     @classmethod
     def from_dict(cls, data):
+        # Equal plain strings within one spec (e.g. a repeated caption) are
+        # collapsed to the first copy seen
+        seen_strings: dict[str, str] = {}
+
         def deserialize_value(value):
             if isinstance(value, str):
-                # Try to parse as various ref types
-                try:
-                    if value.startswith("isekai-resource-ref:\\"):
-                        return ResourceRef.from_string(value)
-                    elif value.startswith("isekai-blob-ref:\\"):
-                        return BlobRef.from_string(value)
-                    elif value.startswith("isekai-model-ref:\\"):
-                        return ModelRef.from_string(value)
-                except ValueError:
-                    pass
+                # Try to parse as a ref, rejecting most plain strings up front
+                if value.startswith("isekai-"):
+                    ref_type = _REF_TYPES_BY_PREFIX.get(value[: value.find("\\") + 1])
+                    if ref_type is not None:
+                        try:
+                            return ref_type.from_string(value)
+                        except ValueError:
+                            pass
                 # If parsing fails or doesn't match patterns, return as string
-                return value
-            elif isinstance(value, dict):
-                return {k: deserialize_value(v) for k, v in value.items()}
-            elif isinstance(value, list | tuple):
-                return [deserialize_value(v) for v in value]
+                if len(value) <= 256:
+                    return seen_strings.setdefault(value, value)
             return value
 
         return cls(
-            content_type=data["content_type"],
-            attributes={
-                key: deserialize_value(value)
-                for key, value in data["attributes"].items()
-            },
+            # Decoded specs repeat the same content type and attribute names,
+            # so they're interned to share one string each
+            content_type=sys.intern(data["content_type"]),
+            # Strings may be refs and are the common case, so scanning lists
+            # for plain values first would rarely pay off here
+            attributes=_map_leaves(
+                data["attributes"], deserialize_value, intern_keys=True
+            ),
         )
 
     def find_refs(self) -> list["BlobRef | ResourceRef"]:
@@ -171,35 +298,36 @@ class Spec:
         Only BlobRef and ResourceRef create resource dependencies.
         ModelRef doesn't create dependencies since it references existing DB objects directly.
         """
-        refs = []
-        seen = set()
-
-        def collect_refs(value):
-            if isinstance(value, BlobRef | ResourceRef):
+        # Refs hash and compare by value, so a dict dedupes them in order
+        refs: dict[BlobRef | ResourceRef, None] = {}
+
+        # Walk with an explicit stack, pushing children in reverse so they're
+        # visited in document order
+        stack: list[Any] = [self.attributes]
+        while stack:
+            value = stack.pop()
+            value_type = type(value)
+            try:
+                copy_type = _COPY_TYPES[value_type]
+            except KeyError:
+                copy_type = _copy_type(value_type)
+
+            if copy_type is dict:
+                stack.extend(reversed(value.values()))
+            elif copy_type is list:
+                stack.extend(reversed(value))
+            elif isinstance(value, _DEPENDENCY_REF_TYPES):
                 # Only collect BlobRef and ResourceRef, not ModelRef
-                ref_str = str(value)
-                if ref_str not in seen:
-                    seen.add(ref_str)
-                    refs.append(value)
+                refs.setdefault(value)
             elif isinstance(value, str):
                 # Find refs embedded in strings (created with ref() helper)
                 string_refs = find_refs_in_string(value)
                 for _, ref_obj in string_refs:
                     # Only collect BlobRef and ResourceRef, not ModelRef
-                    if isinstance(ref_obj, BlobRef | ResourceRef):
-                        ref_str = str(ref_obj)
-                        if ref_str not in seen:
-                            seen.add(ref_str)
-                            refs.append(ref_obj)
-            elif isinstance(value, dict):
-                for v in value.values():
-                    collect_refs(v)
-            elif isinstance(value, list | tuple):
-                for item in value:
-                    collect_refs(item)
-
-        collect_refs(self.attributes)
-        return refs
+                    if isinstance(ref_obj, _DEPENDENCY_REF_TYPES):
+                        refs.setdefault(ref_obj)
+
+        return list(refs)
 
 
 class ModelRef:
@@ -211,6 +339,14 @@ class ModelRef:
     Will fetch the model from the database and resolve to the instance (or attribute value) during Load.
     """
 
+    __slots__ = (
+        "_ref_content_type",
+        "_ref_lookup_kwargs",
+        "_ref_attr_path",
+        "_hash",
+        "_str",
+    )
+
     _prefix: ClassVar[str] = "isekai-model-ref:\\"
 
     def __init__(
@@ -222,31 +358,39 @@ class ModelRef:
 
     @property
     def ref_content_type(self) -> str:
-        return self._ref_content_type  # type: ignore
+        return self._ref_content_type
 
     @property
     def ref_attr_path(self) -> tuple[str, ...]:
-        return self._ref_attr_path  # type: ignore
+        return self._ref_attr_path
 
     @property
     def ref_lookup_kwargs(self) -> dict[str, Any]:
-        return self._ref_lookup_kwargs  # type: ignore
+        return self._ref_lookup_kwargs
 
     def __getattr__(self, name: str) -> "ModelRef":
         """
         Capture attribute access and return a new ModelRef with extended attr_path.
         """
-        # Return new ModelRef with extended attribute path
+        # Internal slots are read directly below, so an unset one must raise
+        # here rather than recurse. Special names are left alone too, so
+        # copy and pickle don't mistake a chained ref for a hook they look up
+        if name in ModelRef.__slots__ or name.startswith("__"):
+            raise AttributeError(name)
         new_ref = ModelRef.__new__(ModelRef)
-        # Access internal attributes via object.__getattribute__ to bypass __getattr__
-        content_type = object.__getattribute__(self, "_ref_content_type")
-        lookup_kwargs = object.__getattribute__(self, "_ref_lookup_kwargs")
-        attr_path = object.__getattribute__(self, "_ref_attr_path")
-        object.__setattr__(new_ref, "_ref_content_type", content_type)
-        object.__setattr__(new_ref, "_ref_lookup_kwargs", lookup_kwargs)
-        object.__setattr__(new_ref, "_ref_attr_path", attr_path + (name,))
+        new_ref._ref_content_type = self._ref_content_type
+        new_ref._ref_lookup_kwargs = self._ref_lookup_kwargs
+        new_ref._ref_attr_path = self._ref_attr_path + (name,)
         return new_ref
 
+    # The hash and string caches are left out, as a string hash is only
+    # valid in the process that computed it
+    def __getstate__(self):
+        return (self._ref_content_type, self._ref_lookup_kwargs, self._ref_attr_path)
+
+    def __setstate__(self, state):
+        ModelRef.__init__(self, state[0], state[2], **state[1])
+
     def __eq__(self, other):
         if not isinstance(other, ModelRef):
             return False
@@ -257,13 +401,21 @@ class ModelRef:
         )
 
     def __hash__(self):
-        return hash(
+        # Computed on first use and cached. Reading the unset slot raises
+        # AttributeError, which __getattr__ lets through for internal slots
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        value = hash(
             (
                 self.ref_content_type,
                 tuple(sorted(self.ref_lookup_kwargs.items())),
                 self.ref_attr_path,
             )
         )
+        object.__setattr__(self, "_hash", value)
+        return value
 
     @classmethod
     def from_string(cls, refstr: str) -> "ModelRef":
@@ -274,27 +426,17 @@ class ModelRef:
         if not refstr.startswith(cls._prefix):
             raise ValueError(f"Invalid ref: {refstr}")
 
-        # Remove prefix
-        rest = refstr.removeprefix(cls._prefix)
+        # Split off the attribute path, then content_type and query string
+        query_part, sep, attr_str = refstr[len(cls._prefix) :].partition("::")
+        attr_path = tuple(attr_str.split(".")) if sep else ()
 
-        # Check if there's an attribute path
-        if "::" in rest:
-            query_part, attr_str = rest.split("::", 1)
-            attr_path = tuple(attr_str.split("."))
-        else:
-            query_part = rest
-            attr_path = ()
-
-        # Split content_type and query string
-        if "?" in query_part:
-            content_type, query_string = query_part.split("?", 1)
-            # Parse query string - parse_qs returns lists, we want single values
-            parsed = parse_qs(query_string)
-            lookup_kwargs = {k: unquote(v[0]) for k, v in parsed.items()}
-        else:
+        content_type, sep, query_string = query_part.partition("?")
+        if not sep:
             raise ValueError(
                 f"Invalid ModelRef format (missing query params): {refstr}"
             )
+        # parse_qsl already decodes the values, so they aren't unquoted again
+        lookup_kwargs = dict(parse_qsl(query_string))
 
         return cls(content_type=content_type, attr_path=attr_path, **lookup_kwargs)
 
@@ -302,16 +444,23 @@ class ModelRef:
         """
         Returns the string representation of the ModelRef.
         """
-        # Convert lookup_kwargs to query string
-        query_string = urlencode(self.ref_lookup_kwargs)
-        base = f"{self._prefix}{self.ref_content_type}?{query_string}"
+        # Formatted on first use and cached, like the hash
+        try:
+            return self._str
+        except AttributeError:
+            pass
+        # Convert lookup_kwargs to query string, sorted so equal refs format
+        # the same whatever order their kwargs were given in
+        query_string = urlencode(sorted(self.ref_lookup_kwargs.items()))
+        value = f"{self._prefix}{self.ref_content_type}?{query_string}"
 
         if self.ref_attr_path:
-            return f"{base}::{'.'.join(self.ref_attr_path)}"
-        return base
+            value = f"{value}::{'.'.join(self.ref_attr_path)}"
+        object.__setattr__(self, "_str", value)
+        return value
 
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True)
 class BlobRef:
     """
     Represents a reference to a blob resource using a Key.
@@ -319,9 +468,20 @@ class BlobRef:
     Will be replaced by the resource's blob data during Load.
     """
 
+    # Slotted by hand like Key, so the string cache isn't a dataclass field
+    __slots__ = ("key", "_str")
+
     key: Key
     _prefix: ClassVar[str] = "isekai-blob-ref:\\"
 
+    # _str is left unset until __str__ first runs, so construction doesn't pay
+    # for it. Pickling and copying go through the key alone
+    def __getstate__(self):
+        return self.key
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "key", state)
+
     @classmethod
     def from_string(cls, refstr: str) -> "BlobRef":
         """
@@ -330,14 +490,26 @@ class BlobRef:
         if not refstr.startswith(cls._prefix):
             raise ValueError(f"Invalid ref: {refstr}")
 
-        key = Key.from_string(refstr.removeprefix(cls._prefix))
-        return cls(key=key)
+        key = Key.from_string(refstr[len(cls._prefix) :])
+        blob_ref = cls(key=key)
+        # A valid ref string is already the formatted form, so cache it as is
+        object.__setattr__(blob_ref, "_str", refstr)
+        return blob_ref
 
     def __str__(self) -> str:
         """
         Returns the string representation of the BlobRef.
         """
-        return f"{self._prefix}{self.key}"
+        # Formatted on first use and cached. The key's fields are formatted
+        # inline rather than through Key.__str__
+        try:
+            return self._str
+        except AttributeError:
+            pass
+        key = self.key
+        value = f"{self._prefix}{key.type}:{key.value}"
+        object.__setattr__(self, "_str", value)
+        return value
 
 
 class ResourceRef:
@@ -349,6 +521,8 @@ class ResourceRef:
     Will be replaced by the resource's model instance (or attribute value) during Load.
     """
 
+    __slots__ = ("_key", "_ref_attr_path", "_hash", "_str")
+
     _prefix: ClassVar[str] = "isekai-resource-ref:\\"
 
     def __init__(self, key: Key, attr_path: tuple[str, ...] = ()):
@@ -357,32 +531,47 @@ class ResourceRef:
 
     @property
     def key(self) -> Key:
-        return self._key  # type: ignore
+        return self._key
 
     @property
     def ref_attr_path(self) -> tuple[str, ...]:
-        return self._ref_attr_path  # type: ignore
+        return self._ref_attr_path
 
     def __getattr__(self, name: str) -> "ResourceRef":
         """
         Capture attribute access and return a new ResourceRef with extended attr_path.
         """
-        # Return new ResourceRef with extended attribute path
+        # Internal slots are read directly below, so an unset one must raise
+        # here rather than recurse. Special names are left alone too, so
+        # copy and pickle don't mistake a chained ref for a hook they look up
+        if name in ResourceRef.__slots__ or name.startswith("__"):
+            raise AttributeError(name)
         new_ref = ResourceRef.__new__(ResourceRef)
-        # Access internal attributes via object.__getattribute__ to bypass __getattr__
-        key = object.__getattribute__(self, "_key")
-        attr_path = object.__getattribute__(self, "_ref_attr_path")
-        object.__setattr__(new_ref, "_key", key)
-        object.__setattr__(new_ref, "_ref_attr_path", attr_path + (name,))
+        new_ref._key = self._key
+        new_ref._ref_attr_path = self._ref_attr_path + (name,)
         return new_ref
 
+    # Caches left out, as in ModelRef.__getstate__
+    def __getstate__(self):
+        return (self._key, self._ref_attr_path)
+
+    def __setstate__(self, state):
+        ResourceRef.__init__(self, *state)
+
     def __eq__(self, other):
         if not isinstance(other, ResourceRef):
             return False
         return self.key == other.key and self.ref_attr_path == other.ref_attr_path
 
     def __hash__(self):
-        return hash((self.key, self.ref_attr_path))
+        # Cached the same way as ModelRef.__hash__
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        value = hash((self.key, self.ref_attr_path))
+        object.__setattr__(self, "_hash", value)
+        return value
 
     @classmethod
     def from_string(cls, refstr: str) -> "ResourceRef":
@@ -393,28 +582,49 @@ class ResourceRef:
         if not refstr.startswith(cls._prefix):
             raise ValueError(f"Invalid ref: {refstr}")
 
-        # Remove prefix
-        rest = refstr.removeprefix(cls._prefix)
-
-        # Check if there's an attribute path
-        if "::" in rest:
-            key_str, attr_str = rest.split("::", 1)
-            attr_path = tuple(attr_str.split("."))
-        else:
-            key_str = rest
-            attr_path = ()
+        # Split off the attribute path, if there is one
+        key_str, sep, attr_str = refstr[len(cls._prefix) :].partition("::")
+        attr_path = tuple(attr_str.split(".")) if sep else ()
 
         key = Key.from_string(key_str)
-        return cls(key=key, attr_path=attr_path)
+        resource_ref = cls(key=key, attr_path=attr_path)
+        # A valid ref string is already the formatted form, so cache it as is
+        object.__setattr__(resource_ref, "_str", refstr)
+        return resource_ref
 
     def __str__(self) -> str:
         """
         Returns the string representation of the ResourceRef.
         """
-        base = f"{self._prefix}{self.key}"
-        if self.ref_attr_path:
-            return f"{base}::{'.'.join(self.ref_attr_path)}"
-        return base
+        # Formatted on first use and cached, like the hash. The key's fields
+        # are formatted inline rather than through Key.__str__
+        try:
+            return self._str
+        except AttributeError:
+            pass
+        key = self.key
+        attr_path = self.ref_attr_path
+        if attr_path:
+            value = f"{self._prefix}{key.type}:{key.value}::{'.'.join(attr_path)}"
+        else:
+            value = f"{self._prefix}{key.type}:{key.value}"
+        object.__setattr__(self, "_str", value)
+        return value
+
+
+# Kept as tuples for isinstance(); spelling out a union like
+# BlobRef | ResourceRef builds a new union object on every check
+_REF_TYPES = (ResourceRef, ModelRef, BlobRef)
+# The refs that make a resource depend on another resource
+_DEPENDENCY_REF_TYPES = (BlobRef, ResourceRef)
+# Whether each type seen in a spec is a ref, filled in on first sight like
+# _COPY_TYPES, so later values cost a dict lookup rather than an MRO check
+_IS_REF_TYPE: dict[type, bool] = dict.fromkeys(_REF_TYPES, True)
+
+# Ref classes by their string prefix, e.g. "isekai-blob-ref:\\"
+_REF_TYPES_BY_PREFIX: dict[str, type[ResourceRef] | type[ModelRef] | type[BlobRef]] = {
+    ref_type._prefix: ref_type for ref_type in _REF_TYPES
+}
 
 
 class Resolver(Protocol):
@@ -13,6 +13,30 @@ def _media_tmpdir(settings, tmp_path):
     settings.MEDIA_ROOT = tmp_path
 
 
+@pytest.fixture
+def frozen_now(monkeypatch):
+    """Freeze timezone.now() for the test and return the frozen time.
+
+    Much cheaper than freezegun, which patches every loaded module on entry and
+    exit. Only suitable for code that reads the time through timezone.now().
+    """
+    from django.utils import timezone
+
+    now = timezone.now()
+    monkeypatch.setattr(timezone, "now", lambda: now)
+    return now
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _warm_content_type_cache(django_db_setup, django_db_blocker):
+    """Load every model's ContentType into the manager's cache in one query."""
+    with django_db_blocker.unblock():
+        from django.apps import apps
+        from django.contrib.contenttypes.models import ContentType
+
+        ContentType.objects.get_for_models(*apps.get_models())
+
+
 @pytest.fixture(autouse=True, scope="session")
 def _setup_wagtail_initial_data(django_db_setup, django_db_blocker):
     """Create Wagtail's initial data (root page, site, collection) when migrations are disabled."""
@@ -60,6 +60,18 @@ class TestWagtailImageTransformer:
 
         assert spec is None
 
+    def test_handles_only_allowed_mime_types(self):
+        transformer = ImageTransformer()
+
+        assert transformer.handles_mime_type("image/png")
+        assert not transformer.handles_mime_type("image/tiff")
+        assert not transformer.handles_mime_type("text/plain")
+
+        transformer = ImageTransformer(allowed_mime_types=["image/tiff"])
+
+        assert transformer.handles_mime_type("image/tiff")
+        assert not transformer.handles_mime_type("image/png")
+
 
 class TestWagtailDocumentTransformer:
     def test_transform_document(self):
@@ -152,6 +164,18 @@ class TestWagtailDocumentTransformer:
         spec = transformer.transform(key, pdf_resource)
         assert spec is None
 
+    def test_handles_only_allowed_mime_types(self):
+        transformer = DocumentTransformer()
+
+        assert transformer.handles_mime_type("application/pdf")
+        assert transformer.handles_mime_type("text/csv")
+        assert not transformer.handles_mime_type("image/png")
+
+        transformer = DocumentTransformer(allowed_mime_types=["text/plain"])
+
+        assert transformer.handles_mime_type("text/plain")
+        assert not transformer.handles_mime_type("application/pdf")
+
 
 @pytest.mark.django_db
 @pytest.mark.database_backend
@@ -2,9 +2,14 @@ import pytest
 from django.utils import timezone
 from freezegun import freeze_time
 
-from isekai.miners import HTMLDocumentMiner, HTMLImageMiner, HTMLPageMiner
+from isekai.miners import (
+    BaseMiner,
+    HTMLDocumentMiner,
+    HTMLImageMiner,
+    HTMLPageMiner,
+)
 from isekai.pipelines import get_django_pipeline
-from isekai.types import Key, TextResource
+from isekai.types import Key, MinedResource, TextResource
 from tests.testapp.models import ConcreteResource
 
 
@@ -17,6 +22,28 @@ class TestHTMLImageMiner:
 
         assert miner.allowed_domains == ["example.com", "cdn.example.com"]
 
+    def test_subclass_extract_urls_sees_the_whole_page(self):
+        """Test that a custom _extract_urls isn't limited to image tags."""
+
+        class BackgroundImageMiner(HTMLImageMiner):
+            def _extract_urls(self, soup):
+                return [
+                    (str(div["data-src"]), {})
+                    for div in soup.find_all("div", attrs={"data-src": True})
+                ]
+
+        miner = BackgroundImageMiner(allowed_domains=["*"])
+        key = Key(type="url", value="https://example.com")
+        resource = TextResource(
+            mime_type="text/html",
+            text='<div data-src="/images/hero.jpg"></div>',
+            metadata={},
+        )
+
+        assert [mr.key for mr in miner.mine(key, resource)] == [
+            Key(type="url", value="https://example.com/images/hero.jpg")
+        ]
+
     def test_miner_finds_images(self):
         miner = HTMLImageMiner(allowed_domains=["*"])
 
@@ -133,6 +160,23 @@ class TestHTMLImageMiner:
         mined_keys = {mr.key for mr in mined_resources}
         assert mined_keys == expected_keys
 
+    def test_miner_reads_host_header_case_insensitively(self):
+        """Test that a lowercased host header is used for base URL construction."""
+        miner = HTMLImageMiner(allowed_domains=["*"])
+
+        key = Key(type="url", value="https://example.com/page")
+        resource = TextResource(
+            mime_type="text/html",
+            text='<img src="/images/logo.png">',
+            metadata={"response_headers": {"host": "cdn.example.com"}},
+        )
+
+        mined_resources = miner.mine(key, resource)
+
+        assert [mr.key for mr in mined_resources] == [
+            Key(type="url", value="https://cdn.example.com/images/logo.png")
+        ]
+
     def test_miner_falls_back_to_url_when_no_host_header(self):
         """Test that HTMLImageMiner falls back to original URL when no Host header."""
         miner = HTMLImageMiner(allowed_domains=["*"])
@@ -263,6 +307,53 @@ class TestHTMLImageMiner:
         mined_keys = {mr.key for mr in mined_resources}
         assert mined_keys == expected_keys
 
+    def test_miner_domain_allowlist_follows_reassignment(self):
+        """Test that allowed_domains can be changed after the miner is built."""
+
+        class Miner(HTMLImageMiner):
+            def __init__(self):
+                # Doesn't call super().__init__()
+                self.allowed_domains = ["example.com"]
+
+        miner = Miner()
+        key = Key(type="url", value="https://example.com")
+        resource = TextResource(
+            mime_type="text/html",
+            text='<img src="https://cdn.example.com/a.jpg">',
+            metadata={},
+        )
+
+        assert miner.mine(key, resource) == []
+
+        miner.allowed_domains = ["cdn.example.com"]
+        assert [mr.key for mr in miner.mine(key, resource)] == [
+            Key(type="url", value="https://cdn.example.com/a.jpg")
+        ]
+
+        miner.allowed_domains = ["*"]
+        assert len(miner.mine(key, resource)) == 1
+
+    def test_miner_domain_allowlist_matches_exact_netlocs(self):
+        """Test that allowed_domains entries don't implicitly allow subdomains."""
+        miner = HTMLImageMiner(allowed_domains=["example.com", "cdn.example.com"])
+
+        key = Key(type="url", value="https://example.com/page")
+        text_data = """
+        <img src="https://example.com/a.jpg">
+        <img src="https://cdn.example.com/b.jpg">
+        <img src="https://static.example.com/c.jpg">
+        <img src="https://notexample.com/d.jpg">
+        """
+
+        resource = TextResource(mime_type="text/html", text=text_data, metadata={})
+
+        mined_resources = miner.mine(key, resource)
+
+        assert [mr.key.value for mr in mined_resources] == [
+            "https://example.com/a.jpg",
+            "https://cdn.example.com/b.jpg",
+        ]
+
     def test_miner_allows_relative_urls_when_no_allowlist(self):
         """Test that relative URLs are allowed even when no allowed_domains is specified."""
         miner = HTMLImageMiner()  # No allowed_domains
@@ -288,6 +379,126 @@ class TestHTMLImageMiner:
         mined_keys = {mr.key for mr in mined_resources}
         assert mined_keys == expected_keys
 
+    def test_miner_returns_unique_urls_when_enabled(self):
+        """Test that the unique class attribute drops repeated URLs on a page."""
+
+        class Miner(HTMLImageMiner):
+            unique = True
+
+        key = Key(type="url", value="https://example.com")
+        text_data = """
+        <img src="images/dog-small.jpg" alt="Dog"
+             srcset="images/dog-small.jpg 480w, images/dog-large.jpg 1024w">
+        <img src="/images/dog-small.jpg" alt="Same dog">
+        """
+
+        resource = TextResource(mime_type="text/html", text=text_data, metadata={})
+
+        mined_resources = Miner(allowed_domains=["*"]).mine(key, resource)
+
+        assert [(mr.key.value, mr.metadata) for mr in mined_resources] == [
+            ("https://example.com/images/dog-small.jpg", {"alt_text": "Dog"}),
+            ("https://example.com/images/dog-large.jpg", {"alt_text": "Dog"}),
+        ]
+
+        # Duplicates are kept by default
+        mined_resources = HTMLImageMiner(allowed_domains=["*"]).mine(key, resource)
+        assert len(mined_resources) == 4
+
+    def test_miner_parses_srcset_candidates(self):
+        """Test that srcset URLs are extracted regardless of descriptor spacing."""
+        miner = HTMLImageMiner()
+
+        assert miner._parse_srcset("  a.jpg 1x ,b.jpg   2x,, c.jpg\n480w ") == [
+            "a.jpg",
+            "b.jpg",
+            "c.jpg",
+        ]
+        assert miner._parse_srcset(" ") == []
+
+    def test_miner_ignores_sources_outside_picture(self):
+        """Test that <source> srcsets are only mined inside <picture> elements."""
+        miner = HTMLImageMiner(allowed_domains=["*"])
+
+        key = Key(type="url", value="https://example.com/page")
+        text_data = """
+        <video><source src="/clip.mp4" srcset="/clip.mp4"></video>
+        <picture><source srcset="/hero.webp"><img src="/hero.jpg"></picture>
+        """
+
+        resource = TextResource(mime_type="text/html", text=text_data, metadata={})
+
+        mined_resources = miner.mine(key, resource)
+
+        assert [mr.key.value for mr in mined_resources] == [
+            "https://example.com/hero.jpg",
+            "https://example.com/hero.webp",
+        ]
+
+    def test_miner_supports_lxml_parser(self):
+        """Test that switching to the lxml tree builder mines the same URLs."""
+        pytest.importorskip("lxml")
+
+        class Miner(HTMLImageMiner):
+            parser = "lxml"
+
+        key = Key(type="url", value="https://example.com")
+        text_data = """
+        <!-- <img src="commented-out.jpg"> -->
+        <img src="images/cat.jpg" alt="Cat" srcset="images/cat-2x.jpg 2x">
+        <video><source srcset="/clip.mp4"></video>
+        <picture>
+          <source srcset="images/bird.webp">
+          <img src="images/bird.jpg" alt="Bird">
+        </picture>
+        """
+
+        resource = TextResource(mime_type="text/html", text=text_data, metadata={})
+
+        lxml_resources = Miner(allowed_domains=["*"]).mine(key, resource)
+        default_resources = HTMLImageMiner(allowed_domains=["*"]).mine(key, resource)
+
+        assert lxml_resources == default_resources
+        assert [mr.key.value for mr in lxml_resources] == [
+            "https://example.com/images/cat.jpg",
+            "https://example.com/images/cat-2x.jpg",
+            "https://example.com/images/bird.jpg",
+            "https://example.com/images/bird.webp",
+        ]
+
+    def test_miner_returns_nothing_for_pages_without_images(self):
+        """Test that pages without image tags yield no resources."""
+        miner = HTMLImageMiner(allowed_domains=["*"])
+
+        key = Key(type="url", value="https://example.com/page")
+        text_data = """
+        <html>
+        <body>
+          <a href="/about">About</a>
+          <p>No images here</p>
+        </body>
+        </html>
+        """
+
+        resource = TextResource(mime_type="text/html", text=text_data, metadata={})
+
+        assert miner.mine(key, resource) == []
+
+    def test_miner_matches_image_tags_case_insensitively(self):
+        """Test that uppercase image tags are still mined."""
+        miner = HTMLImageMiner(allowed_domains=["*"])
+
+        key = Key(type="url", value="https://example.com/page")
+        text_data = '<HTML><BODY><IMG SRC="/logo.png" ALT="Logo"></BODY></HTML>'
+
+        resource = TextResource(mime_type="text/html", text=text_data, metadata={})
+
+        mined_resources = miner.mine(key, resource)
+
+        assert [mr.key for mr in mined_resources] == [
+            Key(type="url", value="https://example.com/logo.png")
+        ]
+
 
 @pytest.mark.django_db
 class TestMine:
@@ -390,6 +601,29 @@ class TestMine:
         assert original_resource.status == ConcreteResource.Status.MINED
         assert original_resource.mined_at == now
 
+    @pytest.mark.database_backend
+    def test_mine_with_existing_key_differing_in_case(self):
+        """Test that keys a case-insensitive collation matches don't fail mining."""
+        # MySQL's default collation matches this against the discovered
+        # "images/cat.jpg" key, other backends treat it as a different key
+        ConcreteResource.objects.create(key="url:https://example.com/images/CAT.jpg")
+        page = ConcreteResource.objects.create(
+            key="url:https://example.com/page",
+            data_type="text",
+            mime_type="text/html",
+            text_data='<img src="images/cat.jpg" alt="Cat">',
+            status=ConcreteResource.Status.EXTRACTED,
+        )
+
+        result = get_django_pipeline().mine()
+
+        assert result.result == "success"
+        page.refresh_from_db()
+        assert page.status == ConcreteResource.Status.MINED
+        assert ConcreteResource.objects.filter(
+            key__iexact="url:https://example.com/images/cat.jpg"
+        ).exists()
+
     def test_mine_is_idempotent_with_duplicate_images(self):
         text_data_1 = """
 <!DOCTYPE html>
@@ -458,8 +692,83 @@ class TestMine:
         second_count = ConcreteResource.objects.count()
         assert second_count == 5  # Same count, no new resources
 
+    def test_mine_only_counts_new_keys_as_seeded(self):
+        # An image that is already known, in a later stage of the pipeline
+        ConcreteResource.objects.create(
+            key="url:https://example.com/images/cat.jpg",
+            data_type="text",
+            text_data="cat",
+            status=ConcreteResource.Status.EXTRACTED,
+        )
+        ConcreteResource.objects.create(
+            key="url:https://example.com/page",
+            data_type="text",
+            mime_type="text/html",
+            text_data='<img src="images/cat.jpg"><img src="images/dog.jpg">',
+            status=ConcreteResource.Status.EXTRACTED,
+        )
+
+        pipeline = get_django_pipeline()
+        result = pipeline.mine()
+
+        assert result.metadata["newly_seeded_count"] == 1
+        assert list(
+            ConcreteResource.objects.filter(
+                status=ConcreteResource.Status.SEEDED
+            ).values_list("key", flat=True)
+        ) == ["url:https://example.com/images/dog.jpg"]
+
+    def test_mine_accepts_generator_miners(self):
+        class GeneratorMiner(BaseMiner):
+            def mine(self, key, resource):
+                for name in ("a", "b"):
+                    yield MinedResource(
+                        key=Key(type="url", value=f"https://example.com/{name}"),
+                        metadata={"name": name},
+                    )
+
+        ConcreteResource.objects.create(
+            key="url:https://example.com",
+            data_type="text",
+            mime_type="text/html",
+            text_data="<html></html>",
+            status=ConcreteResource.Status.EXTRACTED,
+        )
+
+        pipeline = get_django_pipeline()
+        pipeline.miners = [GeneratorMiner()]
+        result = pipeline.mine()
+
+        assert result.metadata["newly_seeded_count"] == 2
+        resources = ConcreteResource.objects.filter(
+            status=ConcreteResource.Status.SEEDED
+        ).order_by("key")
+        assert [(r.key, r.metadata) for r in resources] == [
+            ("url:https://example.com/a", {"name": "a"}),
+            ("url:https://example.com/b", {"name": "b"}),
+        ]
+
 
 class TestHTMLDocumentMiner:
+    def test_subclass_extract_urls_sees_the_whole_page(self):
+        """Test that a custom _extract_urls isn't limited to <a> tags."""
+
+        class Miner(HTMLDocumentMiner):
+            def _extract_urls(self, soup):
+                return [(str(tag["href"]), {}) for tag in soup.find_all("link")]
+
+        miner = Miner(allowed_domains=["*"])
+        key = Key(type="url", value="https://example.com")
+        resource = TextResource(
+            mime_type="text/html",
+            text='<link href="/files/report.pdf"></link><a href="/other/">Other</a>',
+            metadata={},
+        )
+
+        assert [mr.key for mr in miner.mine(key, resource)] == [
+            Key(type="url", value="https://example.com/files/report.pdf")
+        ]
+
     def test_miner_finds_document_links(self):
         """Test that HTMLDocumentMiner finds various document links in HTML."""
         miner = HTMLDocumentMiner(allowed_domains=["*"])
@@ -830,6 +1139,25 @@ class TestHTMLDocumentMiner:
 
 
 class TestHTMLPageMiner:
+    def test_subclass_extract_urls_sees_the_whole_page(self):
+        """Test that a custom _extract_urls isn't limited to <a> tags."""
+
+        class Miner(HTMLPageMiner):
+            def _extract_urls(self, soup):
+                return [(str(tag["src"]), {}) for tag in soup.find_all("iframe")]
+
+        miner = Miner(allowed_domains=["*"])
+        key = Key(type="url", value="https://example.com")
+        resource = TextResource(
+            mime_type="text/html",
+            text='<iframe src="/embedded/"></iframe><a href="/other/">Other</a>',
+            metadata={},
+        )
+
+        assert [mr.key for mr in miner.mine(key, resource)] == [
+            Key(type="url", value="https://example.com/embedded/")
+        ]
+
     def test_miner_finds_page_links(self):
         """Test that HTMLPageMiner finds page links in HTML."""
         miner = HTMLPageMiner(allowed_domains=["*"])
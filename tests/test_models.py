@@ -1,7 +1,10 @@
+from datetime import timedelta
+
 import pytest
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.core.files.base import ContentFile
+from django.utils import timezone
 
 from isekai.types import BlobResource, TextResource, TransitionError
 from tests.testapp.models import Author, ConcreteResource
@@ -56,6 +59,22 @@ class TestAbstractResource:
         )
         assert resource.target_object == user
 
+    def test_blob_resource_created_with_its_file_in_one_insert(
+        self, django_assert_num_queries
+    ):
+        """Test that passing a named ContentFile to create() needs no follow-up UPDATE"""
+        with django_assert_num_queries(1):
+            resource = ConcreteResource.objects.create(
+                key="test-blob",
+                data_type="blob",
+                blob_data=ContentFile(b"blob content", name="blob.bin"),
+            )
+
+        resource.refresh_from_db()
+        assert resource.blob_data.name
+        with resource.blob_data.open() as f:
+            assert f.read() == b"blob content"
+
     def test_get_resource_object(self):
         text_resource = ConcreteResource.objects.create(
             key="url:https://example.com/text.txt",
@@ -161,6 +180,21 @@ class TestExtractedToMinedTransition:
         assert resource.mined_at is not None
         assert resource.last_error == ""
 
+    def test_transition_uses_given_timestamp(self):
+        """Test that transitions stamp the given timestamp instead of the current time"""
+        resource = ConcreteResource.objects.create(
+            key="test-key",
+            status=ConcreteResource.Status.EXTRACTED,
+            text_data="some text",
+            data_type="text",
+        )
+        now = timezone.now() - timedelta(days=1)
+
+        resource.transition_to(ConcreteResource.Status.MINED, now=now)
+
+        assert resource.status == ConcreteResource.Status.MINED
+        assert resource.mined_at == now
+
 
 @pytest.mark.django_db
 class TestMinedToTransformedTransition:
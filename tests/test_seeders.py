@@ -1,10 +1,13 @@
+import gzip
+
 import pytest
 import responses
 from django.utils import timezone
 from freezegun import freeze_time
 
 from isekai.pipelines import get_django_pipeline
-from isekai.seeders import CSVSeeder, SitemapSeeder
+from isekai.seeders import BaseSeeder, CSVSeeder, SitemapSeeder
+from isekai.types import Key, SeededResource
 from tests.test_extractors import ConcreteResource
 
 
@@ -21,6 +24,24 @@ class TestCSVSeeder:
         assert str(seeded_resources[3].key) == "file:my_files/foo.txt"
         assert str(seeded_resources[4].key) == 'json:{"key": "value"}'
 
+    def test_csv_seeder_reads_columns_by_name(self, tmp_path):
+        csv_file = tmp_path / "keys.csv"
+        csv_file.write_text(
+            "value,notes,type\n"
+            "https://example.com/page,,url\n"
+            "short-row\n"
+            '"a,b",quoted,file\n'
+        )
+
+        seeder = CSVSeeder(csv_filename=str(csv_file))
+
+        seeded_resources = seeder.seed()
+
+        assert [str(r.key) for r in seeded_resources] == [
+            "url:https://example.com/page",
+            "file:a,b",
+        ]
+
     def test_class_attrs(self):
         class Seeder(CSVSeeder):
             csv_filename = "tests/files/test_data.csv"
@@ -61,6 +82,30 @@ class TestSitemapSeeder:
         assert str(seeded_resources[3].key) == "url:https://example.com/page4"
         assert str(seeded_resources[4].key) == "url:https://example.com/page5"
 
+    @responses.activate
+    def test_sitemap_seeder_decodes_compressed_response(self):
+        body = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url><loc>https://example.com/page1</loc><lastmod>2024-01-01</lastmod></url>
+    <url><loc>https://example.com/page2</loc></url>
+</urlset>"""
+        responses.add(
+            responses.GET,
+            "https://example.com/sitemap.xml",
+            body=gzip.compress(body.encode()),
+            headers={"Content-Encoding": "gzip"},
+            status=200,
+        )
+
+        seeder = SitemapSeeder(sitemap_url="https://example.com/sitemap.xml")
+
+        seeded_resources = seeder.seed()
+
+        assert [str(r.key) for r in seeded_resources] == [
+            "url:https://example.com/page1",
+            "url:https://example.com/page2",
+        ]
+
     def test_class_attrs(self):
         class Seeder(SitemapSeeder):
             sitemap_url = "https://example.com/sitemap.xml"
@@ -171,3 +216,42 @@ class TestSeed:
         pipeline.seed()
         second_count = ConcreteResource.objects.count()
         assert second_count == 15  # Same count, no new resources
+
+    def test_seed_runs_each_seeder_once_and_keeps_order(self):
+        calls = []
+
+        class Seeder(BaseSeeder):
+            def __init__(self, name, fail=False):
+                self.name = name
+                self.fail = fail
+
+            def seed(self):
+                calls.append(self.name)
+                if self.fail:
+                    raise RuntimeError("Seeder failed")
+                return [
+                    SeededResource(
+                        key=Key(type="url", value="https://example.com/shared"),
+                        metadata={"seeder": self.name},
+                    ),
+                    SeededResource(
+                        key=Key(type="url", value=f"https://example.com/{self.name}"),
+                        metadata={},
+                    ),
+                ]
+
+        pipeline = get_django_pipeline()
+        pipeline.seeders = [
+            Seeder("first"),
+            Seeder("broken", fail=True),
+            Seeder("last"),
+        ]
+        result = pipeline.seed()
+
+        assert sorted(calls) == ["broken", "first", "last"]
+        assert result.result == "partial_success"
+        assert "1 seeders failed" in result.messages
+
+        assert ConcreteResource.objects.count() == 3
+        shared = ConcreteResource.objects.get(key="url:https://example.com/shared")
+        assert shared.metadata == {"seeder": "first"}
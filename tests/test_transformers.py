@@ -1,37 +1,87 @@
 import pytest
+from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.core.files.base import ContentFile
 from django.utils import timezone
-from freezegun import freeze_time
+from wagtail.images import get_image_model
 
 from isekai.pipelines import Pipeline, get_django_pipeline
 from isekai.transformers import BaseTransformer
 from isekai.types import BlobRef, Key, ModelRef, ResourceRef, Spec, TextResource
 from tests.testapp.models import ConcreteResource
 
+# The columns transform() writes, so refreshes skip the resource data
+TRANSFORM_FIELDS = [
+    "target_content_type",
+    "target_spec",
+    "status",
+    "transformed_at",
+    "last_error",
+]
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    """The default Django pipeline, shared by the module's tests."""
+    return get_django_pipeline()
+
+
+@pytest.fixture(scope="module")
+def content_type_ids(django_db_blocker):
+    """Content type ids of the models transform specs target, looked up once."""
+    with django_db_blocker.unblock():
+        content_types = ContentType.objects.get_for_models(get_image_model(), User)
+    return {model: content_type.pk for model, content_type in content_types.items()}
+
+
+@pytest.fixture
+def mined_resources(request, db):
+    """Create MINED resources from the parametrized field dicts in one INSERT."""
+    return ConcreteResource.objects.bulk_create(
+        [
+            ConcreteResource(status=ConcreteResource.Status.MINED, **fields)
+            for fields in request.param
+        ]
+    )
+
 
 @pytest.mark.django_db
 class TestTransform:
-    def test_transform_saves_specs(self):
-        resource = ConcreteResource.objects.create(
-            key="url:https://example.com/image.png",
-            data_type="blob",
-            mime_type="image/png",
-            metadata={"alt_text": "A sample image"},
-            status=ConcreteResource.Status.MINED,
-        )
-        resource.blob_data.save("image.png", ContentFile(b"fake image data"))
+    @pytest.fixture(autouse=True)
+    def _in_memory_storage(self, settings):
+        """Keep blobs in memory; transforming only reads their names."""
+        settings.STORAGES = {
+            "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
 
-        now = timezone.now()
-        with freeze_time(now):
-            pipeline = get_django_pipeline()
-            pipeline.transform()
+    @pytest.mark.parametrize(
+        "mined_resources",
+        [
+            [
+                {
+                    "key": "url:https://example.com/image.png",
+                    "data_type": "blob",
+                    "mime_type": "image/png",
+                    "metadata": {"alt_text": "A sample image"},
+                    "blob_data": ContentFile(b"fake image data", name="image.png"),
+                }
+            ]
+        ],
+        indirect=True,
+    )
+    def test_transform_saves_specs(
+        self, pipeline, content_type_ids, mined_resources, frozen_now
+    ):
+        [resource] = mined_resources
 
-        resource.refresh_from_db()
+        pipeline.transform()
 
-        assert resource.target_content_type == ContentType.objects.get(
-            app_label="wagtailimages", model="image"
-        )
+        resource.refresh_from_db(fields=TRANSFORM_FIELDS)
+
+        assert resource.target_content_type_id == content_type_ids[get_image_model()]
         assert resource.target_spec == {
             "title": "image.png",
             "file": "isekai-blob-ref:\\url:https://example.com/image.png",
@@ -39,7 +89,7 @@ class TestTransform:
         }
 
         assert resource.status == ConcreteResource.Status.TRANSFORMED
-        assert resource.transformed_at == now
+        assert resource.transformed_at == frozen_now
 
         # Verify dependencies are set based on refs in the spec
         dependencies = list(resource.dependencies.all())
@@ -49,7 +99,9 @@ class TestTransform:
             dependencies[0] == resource
         )  # Should reference itself since it's a BlobRef to itself
 
-    def test_transform_handles_transformer_chaining(self):
+    def test_transform_handles_transformer_chaining(
+        self, pipeline, content_type_ids, frozen_now
+    ):
         """Test that transform operation handles transformer chaining correctly."""
 
         # Create a resource with foo/bar mime type that should be handled by FooBarTransformer
@@ -62,26 +114,21 @@ class TestTransform:
             status=ConcreteResource.Status.MINED,
         )
 
-        now = timezone.now()
-        with freeze_time(now):
-            pipeline = get_django_pipeline()
-            pipeline.transform()
+        pipeline.transform()
 
-        resource.refresh_from_db()
+        resource.refresh_from_db(fields=TRANSFORM_FIELDS)
 
         # Should be transformed by FooBarTransformer
-        assert resource.target_content_type == ContentType.objects.get(
-            app_label="auth", model="user"
-        )
+        assert resource.target_content_type_id == content_type_ids[User]
         assert resource.target_spec == {
             "username": "foobar_user",
             "email": "foo@bar.com",
         }
 
         assert resource.status == ConcreteResource.Status.TRANSFORMED
-        assert resource.transformed_at == now
+        assert resource.transformed_at == frozen_now
 
-    def test_transform_is_idempotent(self):
+    def test_transform_is_idempotent(self, pipeline, frozen_now, monkeypatch):
         """Test that running transform multiple times doesn't re-transform already transformed resources."""
         resource = ConcreteResource.objects.create(
             key="url:https://example.com/test-image.png",
@@ -89,32 +136,28 @@ class TestTransform:
             mime_type="image/png",
             metadata={"alt_text": "Test image"},
             status=ConcreteResource.Status.MINED,
+            blob_data=ContentFile(b"test image data", name="test-image.png"),
         )
-        resource.blob_data.save("test-image.png", ContentFile(b"test image data"))
 
         # First transform operation
-        now = timezone.now()
-        with freeze_time(now):
-            pipeline = get_django_pipeline()
-            pipeline.transform()
+        pipeline.transform()
 
         # Verify resource was transformed
-        resource.refresh_from_db()
+        resource.refresh_from_db(fields=TRANSFORM_FIELDS)
         assert resource.status == ConcreteResource.Status.TRANSFORMED
-        assert resource.transformed_at == now
+        assert resource.transformed_at == frozen_now
         original_target_spec = resource.target_spec.copy()
         original_content_type_id = resource.target_content_type_id
 
         # Second transform operation - should not process already transformed resources
-        later = now + timezone.timedelta(hours=1)
-        with freeze_time(later):
-            pipeline = get_django_pipeline()
-            pipeline.transform()  # Should be no-op
+        later = frozen_now + timezone.timedelta(hours=1)
+        monkeypatch.setattr(timezone, "now", lambda: later)
+        pipeline.transform()  # Should be no-op
 
         # Verify resource state unchanged
-        resource.refresh_from_db()
+        resource.refresh_from_db(fields=TRANSFORM_FIELDS)
         assert resource.status == ConcreteResource.Status.TRANSFORMED
-        assert resource.transformed_at == now  # Timestamp should not change
+        assert resource.transformed_at == frozen_now  # Timestamp should not change
         assert (
             resource.target_spec == original_target_spec
         )  # Spec should remain the same
@@ -122,7 +165,7 @@ class TestTransform:
             resource.target_content_type_id == original_content_type_id
         )  # Content type should remain the same
 
-    def test_no_transformer_found_for_resource(self):
+    def test_no_transformer_found_for_resource(self, pipeline):
         """Test that resource remains unchanged if no transformer is found."""
         resource = ConcreteResource.objects.create(
             key="url:https://example.com/unknown-file.xyz",
@@ -130,15 +173,12 @@ class TestTransform:
             mime_type="application/xyz",  # Unsupported mime type
             metadata={},
             status=ConcreteResource.Status.MINED,
+            blob_data=ContentFile(b"unknown data", name="unknown-file.xyz"),
         )
-        resource.blob_data.save("unknown-file.xyz", ContentFile(b"unknown data"))
 
-        now = timezone.now()
-        with freeze_time(now):
-            pipeline = get_django_pipeline()
-            pipeline.transform()
+        pipeline.transform()
 
-        resource.refresh_from_db()
+        resource.refresh_from_db(fields=TRANSFORM_FIELDS)
 
         # Resource should remain in MINED status with no target spec/content type
         assert resource.status == ConcreteResource.Status.MINED
@@ -150,7 +190,7 @@ class TestTransform:
             == "TransformError: No transformer could handle the resource"
         )
 
-    def test_transform_sets_dependencies_from_spec_refs(self):
+    def test_transform_sets_dependencies_from_spec_refs(self, pipeline):
         """Test that transform operation sets dependencies based on refs in the transformed spec."""
         # Test with FooBarTransformer which doesn't create refs - should have no dependencies
         resource_no_deps = ConcreteResource.objects.create(
@@ -162,17 +202,16 @@ class TestTransform:
             status=ConcreteResource.Status.MINED,
         )
 
-        pipeline = get_django_pipeline()
         pipeline.transform()
 
-        resource_no_deps.refresh_from_db()
+        resource_no_deps.refresh_from_db(fields=TRANSFORM_FIELDS)
 
         # FooBarTransformer creates a spec with no refs, so no dependencies
         assert resource_no_deps.status == ConcreteResource.Status.TRANSFORMED
         dependencies = list(resource_no_deps.dependencies.all())
         assert len(dependencies) == 0
 
-    def test_transform_sets_multiple_dependencies_from_spec_refs(self):
+    def test_transform_sets_multiple_dependencies_from_spec_refs(self, frozen_now):
         """Test that transform operation correctly sets multiple dependencies from spec refs."""
 
         # Create dependency resources that will be referenced
@@ -237,12 +276,6 @@ class TestTransform:
                     },
                 )
 
-        # Add content type for our test
-        ContentType.objects.get_or_create(
-            app_label="testapp",
-            model="article",
-        )
-
         # Create pipeline with custom transformer
         pipeline = Pipeline(
             seeders=[],
@@ -252,15 +285,13 @@ class TestTransform:
             loaders=[],
         )
 
-        now = timezone.now()
-        with freeze_time(now):
-            pipeline.transform()
+        pipeline.transform()
 
-        main_resource.refresh_from_db()
+        main_resource.refresh_from_db(fields=TRANSFORM_FIELDS)
 
         # Verify resource was transformed
         assert main_resource.status == ConcreteResource.Status.TRANSFORMED
-        assert main_resource.transformed_at == now
+        assert main_resource.transformed_at == frozen_now
 
         # Verify the spec was created correctly with refs
         expected_spec = {
@@ -331,12 +362,6 @@ class TestTransform:
                     },
                 )
 
-        # Add content type for our test
-        ContentType.objects.get_or_create(
-            app_label="testapp",
-            model="article",
-        )
-
         # Create pipeline with transformer that references non-existent resources
         pipeline = Pipeline(
             seeders=[],
@@ -350,8 +375,235 @@ class TestTransform:
         pipeline.transform()
 
         # Verify that the resource remains in MINED status due to the error
-        main_resource.refresh_from_db()
+        main_resource.refresh_from_db(fields=TRANSFORM_FIELDS)
         assert main_resource.status == ConcreteResource.Status.MINED
 
         # Verify that the error was captured
         assert main_resource.last_error == "TransformError: Invalid refs found in spec"
+
+    def test_transform_fails_with_unknown_content_type(self):
+        """Test that transform operation fails when specs target an unknown model."""
+        resource = ConcreteResource.objects.create(
+            key="foo:unknown-content-type",
+            data_type="text",
+            mime_type="text/plain",
+            text_data="some text",
+            status=ConcreteResource.Status.MINED,
+        )
+
+        class UnknownContentTypeTransformer(BaseTransformer):
+            def transform(self, key: Key, resource):
+                return Spec(content_type="testapp.Missing", attributes={})
+
+        pipeline = Pipeline(
+            seeders=[],
+            extractors=[],
+            miners=[],
+            transformers=[UnknownContentTypeTransformer()],
+            loaders=[],
+        )
+
+        pipeline.transform()
+
+        resource.refresh_from_db(fields=TRANSFORM_FIELDS)
+        assert resource.status == ConcreteResource.Status.MINED
+        assert resource.target_content_type is None
+        assert (
+            resource.last_error
+            == "TransformError: Unknown content type: testapp.Missing"
+        )
+
+    def test_transform_records_unserializable_specs_per_resource(self):
+        """Test that a spec that can't be saved as JSON fails only its resource."""
+        good = ConcreteResource.objects.create(
+            key="foo:good",
+            data_type="text",
+            mime_type="text/plain",
+            text_data="good",
+            status=ConcreteResource.Status.MINED,
+        )
+        bad = ConcreteResource.objects.create(
+            key="foo:bad",
+            data_type="text",
+            mime_type="text/plain",
+            text_data="bad",
+            status=ConcreteResource.Status.MINED,
+        )
+
+        class UserTransformer(BaseTransformer):
+            def transform(self, key: Key, resource: TextResource):
+                attributes: dict = {"username": resource.text}
+                if resource.text == "bad":
+                    attributes["date_joined"] = timezone.now()
+                return Spec(content_type="auth.User", attributes=attributes)
+
+        pipeline = Pipeline(
+            seeders=[],
+            extractors=[],
+            miners=[],
+            transformers=[UserTransformer()],
+            loaders=[],
+        )
+
+        result = pipeline.transform()
+
+        assert result.result == "partial_success"
+
+        good.refresh_from_db(fields=TRANSFORM_FIELDS)
+        assert good.status == ConcreteResource.Status.TRANSFORMED
+        assert good.target_spec == {"username": "good"}
+
+        bad.refresh_from_db(fields=TRANSFORM_FIELDS)
+        assert bad.status == ConcreteResource.Status.MINED
+        assert bad.target_spec is None
+        assert bad.last_error.startswith("TypeError: ")
+
+    @pytest.mark.database_backend
+    def test_transform_isolates_database_errors_per_resource(self):
+        """Test that a database error in one transformer doesn't abort the run."""
+        User.objects.create(username="taken")
+        resources = [
+            ConcreteResource.objects.create(
+                key=f"foo:{name}",
+                data_type="text",
+                mime_type="text/plain",
+                text_data=name,
+                status=ConcreteResource.Status.MINED,
+            )
+            for name in ("a", "bad", "c")
+        ]
+
+        class UserTransformer(BaseTransformer):
+            def transform(self, key: Key, resource: TextResource):
+                if resource.text == "bad":
+                    # Violates the unique username, which aborts the current
+                    # transaction on backends such as Postgres
+                    User.objects.create(username="taken")
+                return Spec(
+                    content_type="auth.User", attributes={"username": key.value}
+                )
+
+        pipeline = Pipeline(
+            seeders=[],
+            extractors=[],
+            miners=[],
+            transformers=[UserTransformer()],
+            loaders=[],
+        )
+
+        result = pipeline.transform()
+
+        assert result.result == "partial_success"
+        a, bad, c = resources
+        for resource in (a, c):
+            resource.refresh_from_db(fields=TRANSFORM_FIELDS)
+            assert resource.status == ConcreteResource.Status.TRANSFORMED
+        bad.refresh_from_db(fields=TRANSFORM_FIELDS)
+        assert bad.status == ConcreteResource.Status.MINED
+        assert bad.last_error.startswith("IntegrityError: ")
+
+    def test_transform_only_offers_resources_to_matching_transformers(self):
+        """Test that transformers only see resources matching their mime_types."""
+        image = ConcreteResource.objects.create(
+            key="foo:image",
+            data_type="text",
+            mime_type="image/svg+xml",
+            text_data="<svg></svg>",
+            status=ConcreteResource.Status.MINED,
+        )
+        page = ConcreteResource.objects.create(
+            key="foo:page",
+            data_type="text",
+            mime_type="text/html",
+            text_data="<html></html>",
+            status=ConcreteResource.Status.MINED,
+        )
+
+        seen = []
+
+        class ImageTransformer(BaseTransformer):
+            mime_types = ["image/*"]
+
+            def transform(self, key: Key, resource):
+                seen.append(("image", str(key)))
+                return Spec(content_type="auth.User", attributes={"username": "i"})
+
+        class HTMLTransformer(BaseTransformer):
+            mime_types = ["text/html"]
+
+            def transform(self, key: Key, resource):
+                seen.append(("html", str(key)))
+                return Spec(content_type="auth.User", attributes={"username": "h"})
+
+        class FallbackTransformer(BaseTransformer):
+            def transform(self, key: Key, resource):
+                seen.append(("fallback", str(key)))
+                return None
+
+        pipeline = Pipeline(
+            seeders=[],
+            extractors=[],
+            miners=[],
+            transformers=[
+                FallbackTransformer(),
+                ImageTransformer(),
+                HTMLTransformer(),
+            ],
+            loaders=[],
+        )
+
+        pipeline.transform()
+
+        assert seen == [
+            ("fallback", "foo:image"),
+            ("image", "foo:image"),
+            ("fallback", "foo:page"),
+            ("html", "foo:page"),
+        ]
+
+        image.refresh_from_db(fields=TRANSFORM_FIELDS)
+        page.refresh_from_db(fields=TRANSFORM_FIELDS)
+        assert image.target_spec == {"username": "i"}
+        assert page.target_spec == {"username": "h"}
+
+    def test_transform_saves_resources_in_bulk(self, django_assert_max_num_queries):
+        """Test that the number of queries doesn't grow with the number of resources."""
+        author = ConcreteResource.objects.create(key="foo:author")
+        for i in range(10):
+            ConcreteResource.objects.create(
+                key=f"foo:article-{i}",
+                data_type="text",
+                mime_type="application/x-test-bulk",
+                text_data=f"Article {i}",
+                status=ConcreteResource.Status.MINED,
+            )
+
+        class ArticleTransformer(BaseTransformer):
+            def transform(self, key: Key, resource: TextResource):
+                return Spec(
+                    content_type="testapp.Article",
+                    attributes={
+                        "title": resource.text,
+                        "author": ResourceRef(Key(type="foo", value="author")),
+                    },
+                )
+
+        pipeline = Pipeline(
+            seeders=[],
+            extractors=[],
+            miners=[],
+            transformers=[ArticleTransformer()],
+            loaders=[],
+        )
+
+        # A savepoint and one dependency existence check per resource, plus a
+        # fixed number of queries to fetch and save them
+        with django_assert_max_num_queries(10 * 3 + 8):
+            pipeline.transform()
+
+        resources = ConcreteResource.objects.filter(
+            status=ConcreteResource.Status.TRANSFORMED
+        )
+        assert resources.count() == 10
+        for resource in resources:
+            assert list(resource.dependencies.all()) == [author]
@@ -1,3 +1,11 @@
+import copy
+import dataclasses
+import json
+import pickle
+import sys
+from collections import OrderedDict, namedtuple
+from enum import Enum
+
 from isekai.types import (
     BlobRef,
     Key,
@@ -27,6 +35,63 @@ class TestKey:
         with pytest.raises(ValueError):
             Key.from_string("test:")
 
+    def test_key_is_hashable_value_object(self):
+        key = Key(type="url", value="https://example.com")
+
+        # Equal keys collapse in sets and dicts
+        keys = {key, Key(type="url", value="https://example.com")}
+        assert keys == {key}
+        assert {key: 1}[Key.from_string("url:https://example.com")] == 1
+
+        # Keys are immutable and don't carry a per-instance __dict__
+        with pytest.raises(AttributeError):
+            key.value = "https://example.org"  # type: ignore[misc]
+        assert not hasattr(key, "__dict__")
+
+    def test_key_copies_and_pickles(self):
+        key = Key(type="url", value="https://example.com")
+        parsed = Key.from_string("url:https://example.com")
+
+        for original in (key, parsed):
+            for clone in (
+                copy.copy(original),
+                copy.deepcopy(original),
+                pickle.loads(pickle.dumps(original)),
+            ):
+                assert clone == original
+                assert hash(clone) == hash(original)
+                assert str(clone) == "url:https://example.com"
+
+        # The string and hash caches aren't dataclass fields
+        assert [f.name for f in dataclasses.fields(Key)] == ["type", "value"]
+        assert dataclasses.asdict(key) == {
+            "type": "url",
+            "value": "https://example.com",
+        }
+        assert dataclasses.astuple(key) == ("url", "https://example.com")
+
+    def test_key_type_is_interned(self):
+        parsed = Key.from_string("custom:123")
+        built = Key(type="".join(["cus", "tom"]), value="456")
+
+        assert parsed.type is built.type
+
+    def test_key_type_can_be_a_str_subclass(self):
+        class KeyType(str, Enum):
+            DOC = "doc"
+
+        key = Key(type=KeyType.DOC, value="1")
+
+        assert str(key) == "doc:1"
+        assert key == Key.from_string("doc:1")
+        assert type(key.type) is str
+
+    def test_parsing_a_key_again_reuses_the_instance(self):
+        first = Key.from_string("url:https://example.com/reused")
+        second = Key.from_string("".join(["url:", "https://example.com/reused"]))
+
+        assert first is second
+
 
 class TestRefs:
     def test_blob_ref(self):
@@ -108,6 +173,67 @@ class TestRefs:
         with pytest.raises(ValueError):
             ResourceRef.from_string("resource:\\test:123")
 
+    def test_refs_are_hashable_value_objects(self):
+        key = Key(type="article", value="456")
+        resource_ref = ResourceRef(key).author.name
+        model_ref = ModelRef("testapp.Category", pk=1).name
+
+        # Equal refs collapse in sets, including after the hash is cached
+        assert hash(resource_ref) == hash(resource_ref)
+        assert {resource_ref, ResourceRef(key, ("author", "name"))} == {resource_ref}
+        assert {model_ref, ModelRef("testapp.Category", ("name",), pk=1)} == {model_ref}
+
+        # Refs don't carry a per-instance __dict__
+        assert "__dict__" not in dir(resource_ref)
+        assert "__dict__" not in dir(model_ref)
+
+    def test_refs_copy_and_pickle(self):
+        key = Key(type="gen", value="author")
+        refs = [
+            BlobRef(key),
+            BlobRef.from_string("isekai-blob-ref:\\file:image.png"),
+            ResourceRef(key).group.name,
+            ResourceRef.from_string("isekai-resource-ref:\\gen:author::name"),
+            ModelRef("testapp.Author", pk=42).name,
+        ]
+        spec = Spec(
+            content_type="testapp.Article",
+            attributes={"refs": refs, "nested": {"ref": ResourceRef(key)}},
+        )
+
+        for original in refs:
+            # Cache the string and hash before copying
+            str(original)
+            hash(original)
+            for clone in (
+                copy.copy(original),
+                copy.deepcopy(original),
+                pickle.loads(pickle.dumps(original)),
+            ):
+                assert clone == original
+                assert str(clone) == str(original)
+
+        for clone in (copy.deepcopy(spec), pickle.loads(pickle.dumps(spec))):
+            assert clone == spec
+            assert clone.to_dict() == spec.to_dict()
+
+    def test_parsed_refs_reuse_their_input_string(self):
+        blob_str = "isekai-blob-ref:\\file:image.png"
+        resource_str = "isekai-resource-ref:\\gen:author::group.name"
+
+        assert str(BlobRef.from_string(blob_str)) is blob_str
+        assert str(ResourceRef.from_string(resource_str)) is resource_str
+
+    def test_chained_refs_format_their_own_path(self):
+        resource_ref = ResourceRef(Key(type="gen", value="author"))
+        model_ref = ModelRef("testapp.Author", pk=42)
+
+        # Formatting the parent first must not leak its string into the chain
+        assert str(resource_ref) == "isekai-resource-ref:\\gen:author"
+        assert str(resource_ref.name) == "isekai-resource-ref:\\gen:author::name"
+        assert str(model_ref) == "isekai-model-ref:\\testapp.Author?pk=42"
+        assert str(model_ref.name) == "isekai-model-ref:\\testapp.Author?pk=42::name"
+
     def test_model_ref_basic(self):
         # Basic ModelRef with single kwarg
         ref = ModelRef("testapp.Author", pk=42)
@@ -122,11 +248,15 @@ class TestRefs:
     def test_model_ref_multiple_kwargs(self):
         # ModelRef with multiple kwargs
         ref = ModelRef("auth.User", email="test@example.com", is_active=True)
-        ref_str = str(ref)
-        assert ref_str.startswith("isekai-model-ref:\\auth.User?")
-        # Query params can be in any order, so check both contain the same params
-        assert "email=test%40example.com" in ref_str
-        assert "is_active=True" in ref_str
+        assert (
+            str(ref)
+            == "isekai-model-ref:\\auth.User?email=test%40example.com&is_active=True"
+        )
+
+        # Query params are sorted, so kwarg order doesn't change the string
+        assert str(ModelRef("auth.User", is_active=True, email="test@example.com")) == (
+            str(ref)
+        )
 
         # ModelRef from string with multiple params
         ref = ModelRef.from_string(
@@ -138,6 +268,11 @@ class TestRefs:
             "is_active": "True",
         }
 
+    def test_model_ref_roundtrips_percent_encoded_values(self):
+        ref = ModelRef("testapp.Article", slug="100%25-done")
+
+        assert ModelRef.from_string(str(ref)) == ref
+
     def test_model_ref_with_attribute_access(self):
         # ModelRef with attribute access
         ref = ModelRef("testapp.Author", pk=42).group.name
@@ -341,6 +476,24 @@ class TestSpec:
 
         assert spec.to_dict() == expected_dict
 
+    def test_to_dict_container_subclasses(self):
+        Point = namedtuple("Point", ["x", "y"])
+        spec = Spec(
+            content_type="foo.Subclasses",
+            attributes={
+                "ordered": OrderedDict(
+                    image=BlobRef(Key(type="file", value="ordered.png"))
+                ),
+                "point": Point(1, ResourceRef(Key(type="gen", value="y")).pk),
+            },
+        )
+
+        attributes = spec.to_dict()["attributes"]
+
+        assert type(attributes["ordered"]) is dict
+        assert attributes["ordered"] == {"image": "isekai-blob-ref:\\file:ordered.png"}
+        assert attributes["point"] == [1, "isekai-resource-ref:\\gen:y::pk"]
+
     def test_to_dict_empty_attributes(self):
         spec = Spec(
             content_type="foo.Empty",
@@ -564,6 +717,22 @@ class TestSpec:
 
         assert spec == expected_spec
 
+    def test_from_dict_interns_names(self):
+        raw = '{"content_type": "foo.Bar", "attributes": {"nested": {"title": "x"}}}'
+        first = Spec.from_dict(json.loads(raw))
+        second = Spec.from_dict(json.loads(raw))
+
+        assert first.content_type is second.content_type
+        [first_key] = first.attributes["nested"]
+        [second_key] = second.attributes["nested"]
+        assert first_key is second_key
+
+    def test_from_dict_shares_repeated_strings(self):
+        raw = '{"content_type": "foo.Bar", "attributes": {"a": "Caption", "b": ["Caption"]}}'
+        spec = Spec.from_dict(json.loads(raw))
+
+        assert spec.attributes["a"] is spec.attributes["b"][0]
+
     def test_from_dict_invalid_ref_string(self):
         data = {
             "content_type": "foo.Invalid",
@@ -612,6 +781,30 @@ class TestSpec:
 
         assert reconstructed_spec == original_spec
 
+    def test_roundtrip_beyond_recursion_limit(self):
+        depth = sys.getrecursionlimit() + 100
+        attributes: dict = {"leaf": BlobRef(Key(type="file", value="deep.png"))}
+        for i in range(depth):
+            attributes = {"child": [attributes] if i % 2 else attributes}
+
+        spec = Spec(content_type="foo.Deep", attributes=attributes)
+        dict_data = spec.to_dict()
+
+        def innermost(attributes):
+            # Walk down by hand, as comparing the whole tree would itself recurse
+            for i in reversed(range(depth)):
+                attributes = attributes["child"]
+                if i % 2:
+                    attributes = attributes[0]
+            return attributes
+
+        assert innermost(dict_data["attributes"]) == {
+            "leaf": "isekai-blob-ref:\\file:deep.png"
+        }
+        assert innermost(Spec.from_dict(dict_data).attributes) == {
+            "leaf": BlobRef(Key(type="file", value="deep.png"))
+        }
+
     def test_find_refs(self):
         spec = Spec(
             content_type="foo.WithRefs",
@@ -791,3 +984,30 @@ class TestSpec:
         assert BlobRef(image_key) in refs
         assert ResourceRef(author_key).pk in refs
         assert ResourceRef(category_key).name in refs
+
+    def test_find_refs_in_document_order(self):
+        first = BlobRef(Key(type="file", value="first.png"))
+        second = ResourceRef(Key(type="gen", value="second")).pk
+        third = BlobRef(Key(type="file", value="third.png"))
+
+        spec = Spec(
+            content_type="testapp.Article",
+            attributes={
+                "gallery": [first, {"credit": second}],
+                "body": f"See {ref(third)} and {ref(first)}",
+                "hero": (third, second),
+            },
+        )
+
+        # Repeats keep the position of their first occurrence
+        assert spec.find_refs() == [first, second, third]
+
+    def test_find_refs_beyond_recursion_limit(self):
+        leaf = BlobRef(Key(type="file", value="deep.png"))
+        attributes: dict = {"leaf": leaf}
+        for _ in range(sys.getrecursionlimit() + 100):
+            attributes = {"child": [attributes]}
+
+        spec = Spec(content_type="foo.Deep", attributes=attributes)
+
+        assert spec.find_refs() == [leaf]
@@ -26,6 +26,8 @@ class FooBarExtractor(BaseExtractor):
 
 
 class FooBarTransformer(BaseTransformer):
+    mime_types = ["foo/bar"]
+
     def transform(self, key, resource):
         if resource.mime_type != "foo/bar":
             return None